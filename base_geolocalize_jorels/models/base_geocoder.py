@@ -22,10 +22,11 @@
 
 import logging
 
-import requests
 from odoo import models, api, _
 from odoo.exceptions import UserError
 
+from ..tools.ody_session import ody_session, ODY_TIMEOUT
+
 _logger = logging.getLogger(__name__)
 
 
@@ -55,7 +56,7 @@ class GeoCoder(models.AbstractModel):
         params = {'q': addr}
 
         try:
-            result = requests.get(url, headers=header, params=params).json()
+            result = ody_session.get(url, headers=header, params=params, timeout=ODY_TIMEOUT).json()
         except Exception as e:
             self._raise_query_error(e)
 
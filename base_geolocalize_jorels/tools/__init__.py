@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2024)
+#
+# This file is part of base_geolocalize_jorels.
+#
+# base_geolocalize_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# base_geolocalize_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with base_geolocalize_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+from .ody_session import ody_session, ODY_TIMEOUT
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2024)
+#
+# This file is part of base_geolocalize_jorels.
+#
+# base_geolocalize_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# base_geolocalize_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with base_geolocalize_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeouts in seconds
+ODY_TIMEOUT = (5, 30)
+
+
+def _new_session():
+    """Keep-alive session for the Jorels Maps (Ody) API, with retries and exponential backoff.
+
+    Only GET requests are sent again on a 429/502/503/504 answer: the route POST may have been processed already.
+    """
+    retry = Retry(total=2, connect=2, read=0, backoff_factor=0.5, status_forcelist=(429, 502, 503, 504),
+                  allowed_methods=frozenset({'GET'}), raise_on_status=False)
+    adapter = HTTPAdapter(max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+ody_session = _new_session()
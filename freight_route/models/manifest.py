@@ -21,6 +21,7 @@
 #
 
 import logging
+from functools import lru_cache
 
 import requests
 import urllib3
@@ -29,9 +30,17 @@ from odoo import _
 from odoo import api, fields, models
 from odoo.exceptions import UserError
 
+from odoo.addons.base_geolocalize_jorels.tools.ody_session import ody_session, ODY_TIMEOUT
+
 _logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=512)
+def amount_to_words(amount, lang, unit_label):
+    """Integer amount in words in upper case, followed by the currency label, e.g. 'CERO PESOS'"""
+    return num2words(amount, lang=lang).upper() + ' ' + (unit_label or '').upper()
+
+
 class Manifest(models.Model):
     _name = 'freight_route.manifest'
     _description = 'Manifest'
@@ -107,6 +116,7 @@ class Manifest(models.Model):
                                          compute='_compute_total_others_value', store=True, copy=False, tracking=True)
 
     agreed_value = fields.Monetary(string='Agreed value', currency_field='currency_id', copy=False, tracking=True)
+    value_letters = fields.Char(string='Agreed value in letters', compute='_value_letters')
     assistant_value = fields.Monetary(string='Assistant value', readonly=True, currency_field='currency_id', copy=False,
                                       tracking=True)
 
@@ -121,11 +131,10 @@ class Manifest(models.Model):
     quantity_units = fields.Integer('# Units', copy=False, tracking=True)
     quantity_waypoints = fields.Integer('# Waypoints', copy=False, tracking=True)
 
-    @api.depends('agreed_value')
+    @api.depends('agreed_value', 'currency_id')
     def _value_letters(self):
         for rec in self:
-            rec.value_letters = num2words(round(rec.agreed_value), lang='es_CO').upper() + ' ' + \
-                                rec.currency_id.currency_unit_label.upper()
+            rec.value_letters = amount_to_words(round(rec.agreed_value), 'es_CO', rec.currency_id.currency_unit_label)
 
     def compute_totals_fields(self):
         self._compute_total_cash()
@@ -273,7 +282,7 @@ class Manifest(models.Model):
         data = {"waypoints": waypoints_data}
 
         try:
-            response = requests.post(url, json=data, headers=headers).json()
+            response = ody_session.post(url, json=data, headers=headers, timeout=ODY_TIMEOUT).json()
 
             if 'code' in response and response['code'] == 'Ok':
                 return response, enable_waypoints
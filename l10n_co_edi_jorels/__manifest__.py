@@ -27,7 +27,7 @@
     'author': "Jorels SAS",
     'license': "LGPL-3",
     'category': 'Invoicing & Payments',
-    'version': '16.0.24.05.010000',
+    'version': '16.0.26.10.180000',
     'website': "https://www.jorels.com",
     'images': ['static/images/main_screenshot.png'],
     'support': 'info@jorels.com',
@@ -47,6 +47,7 @@
         'security/ir.model.access.csv',
         'data/ir_sequence_data.xml',
         'data/data.xml',
+        'data/ir_cron_data.xml',
         'views/config/res_company.xml',
         'views/config/res_config_settings_views.xml',
         'views/config/resolution_views.xml',
@@ -59,6 +60,10 @@
         'views/mail_message_views.xml',
         'views/account_move_reversal_view.xml',
         'views/radian_views.xml',
+        'views/submission_queue_views.xml',
+        'views/status_sweep_views.xml',
+        'views/webhook_document_views.xml',
+        'views/phase_stat_views.xml',
         'views/listings/l10n_co_edi_jorels_taxes_view.xml',
         'report/report_invoice.xml',
         'data/mail_template_data.xml',
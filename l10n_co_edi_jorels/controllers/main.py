@@ -20,6 +20,7 @@
 # email: info@jorels.com
 #
 
+import hmac
 import json
 import logging
 
@@ -31,22 +32,50 @@ _logger = logging.getLogger(__name__)
 
 class Webhooks(http.Controller):
 
-    @http.route('/l10n_co_edi_jorels/webhook/in_invoice/<company_id>', type='json', auth='public', methods=['POST'],
-                csrf=False)
+    @http.route('/l10n_co_edi_jorels/webhook/in_invoice/<int:company_id>', type='http', auth='public',
+                methods=['POST'], csrf=False)
     def webhook_in_invoice(self, company_id, **args):
-        # journal_id = 2
-        # partner_id = 1
-        # json_example = {'a': 1, 'b': 2, 'c': '3', 'd': '4'}
-
-        # data = json.loads(request.httprequest.args)
-        data = json.loads(request.httprequest.data)
-
-        # request.env['account.move'].sudo().create({
-        #     'partner_id': partner_id,
-        #     'journal_id': journal_id,
-        #     'move_type': 'in_invoice',
-        #     'comment': data
-        # })
-
-        _logger.debug("webhook_in_invoice: company_id: %s, json: %s", company_id, data)
-        return "Test Ok"
+        """Receive supplier e-invoices as a JSON document or a JSON array of documents.
+
+        Each document needs an 'idempotency_key' (or at least its 'uuid', the CUFE). The documents are only staged
+        here and acknowledged; the invoices are created in background by the webhook documents cron. The caller
+        authenticates with the company webhook secret as a bearer token, never in the URL.
+        """
+        company = request.env['res.company'].sudo().browse(company_id).exists()
+        authorization = request.httprequest.headers.get('Authorization', '')
+        token = authorization[len('Bearer '):] if authorization.startswith('Bearer ') else ''
+        secret = company.ei_webhook_secret if company else False
+        if not secret or not token or not hmac.compare_digest(token.encode('utf-8'), secret.encode('utf-8')):
+            return request.make_json_response({'error': 'Unauthorized'}, status=401)
+
+        try:
+            data = json.loads(request.httprequest.get_data())
+        except ValueError:
+            return request.make_json_response({'error': 'Invalid JSON'}, status=400)
+
+        documents = data if isinstance(data, list) else [data]
+        result = request.env['l10n_co_edi_jorels.webhook_document'].sudo()._ingest(company, documents)
+
+        _logger.debug("webhook_in_invoice: company_id: %s, result: %s", company_id, result)
+        return request.make_json_response(result, status=202)
+
+
+class Metrics(http.Controller):
+
+    @http.route('/l10n_co_edi_jorels/metrics', type='http', auth='public', methods=['GET'], csrf=False)
+    def metrics(self, token=None, **args):
+        """E-invoicing phase timings in the Prometheus text format.
+
+        Disabled until the 'jorels.edipo.metrics_token' system parameter is set, the scraper sends it as a bearer
+        token or in the 'token' query parameter.
+        """
+        expected = request.env['ir.config_parameter'].sudo().get_param('jorels.edipo.metrics_token')
+        if not expected:
+            raise request.not_found()
+
+        token = request.httprequest.headers.get('Authorization', '').replace('Bearer ', '', 1) or token
+        if not token or not hmac.compare_digest(str(token).encode('utf-8'), expected.encode('utf-8')):
+            return request.make_response('Unauthorized', status=401)
+
+        body = request.env['l10n_co_edi_jorels.phase_stat'].sudo()._get_prometheus_metrics()
+        return request.make_response(body, headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')])
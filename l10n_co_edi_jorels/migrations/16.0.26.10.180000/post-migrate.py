@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """The cron moving the old inline payloads to attachments is in a noupdate block, activate it on upgrade"""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    cron = env.ref('l10n_co_edi_jorels.ir_cron_migrate_payloads', raise_if_not_found=False)
+    if cron:
+        cron.active = True
+        cron._trigger()
@@ -32,3 +32,7 @@ from . import account_move_reversal
 from . import account_debit_note
 from . import mail_template
 from . import radian
+from . import submission_queue
+from . import status_sweep
+from . import webhook_document
+from . import phase_stat
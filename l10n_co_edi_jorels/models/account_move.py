@@ -21,20 +21,50 @@
 #
 
 import base64
+import hashlib
 import json
 import logging
-import math
 import re
-from io import BytesIO
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 
-import qrcode
-import requests
-from num2words import num2words
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+from odoo.tools.lru import LRU
+
+from ..tools.amount_words import amount_to_words
+from ..tools.attached_document import parse_attached_document
+from ..tools.http_client import http_client, CircuitOpenError, RateLimiter
+from ..tools.payload_storage import compress_payload, decompress_payload, migrate_inline_payloads
+from ..tools.qr_code import render_qr, render_qr_data_uri
 
 _logger = logging.getLogger(__name__)
 
+# Payloads by dependencies hash, shared by all the worker threads of the process
+_json_request_cache = LRU(512)
+_json_request_cache_stats = {'hits': 0, 'misses': 0}
+
+# Default RADIAN events of the credit documents, by move type: (event type, event ids)
+# 3: Acknowledgment of receipt, 5: Receipt of the good and/or provision of the service, 6: Express acceptance,
+# 7: Tacit acceptance
+RADIAN_DEFAULT_EVENTS = {
+    'out_invoice': ('customer', (7,)),
+    'out_refund': ('customer', (7,)),
+    'in_invoice': ('supplier', (3, 5, 6)),
+    'in_refund': ('supplier', (3, 5, 6)),
+}
+
+
+def _fetch_nimbus(request, limiter):
+    # Only HTTP, no ORM: it runs in the worker threads
+    limiter.wait()
+    try:
+        return http_client.get(request['url'], headers=request['headers']).json()
+    except Exception as e:
+        _logger.debug("Nimbus UUID synchronization: invalid response: %s", e)
+        return None
+
 
 class AccountMove(models.Model):
     _inherit = "account.move"
@@ -102,7 +132,10 @@ class AccountMove(models.Model):
                                           string="Type environment", copy=False, readonly=True,
                                           states={'draft': [('readonly', False)]},
                                           default=lambda self: self._default_ei_type_environment())
-    ei_payload = fields.Text("Payload", copy=False, readonly=True)
+    # Stored gzip-compressed in the filestore, only loaded when opened
+    ei_payload = fields.Text("Payload", copy=False, readonly=True, compute='_compute_ei_payload',
+                             inverse='_inverse_ei_payload')
+    ei_payload_file = fields.Binary("Payload file", attachment=True, copy=False, readonly=True)
 
     # Old fields, compatibility
     ei_xml_file_name = fields.Char(string="Xml file name", copy=False, readonly=True)
@@ -115,9 +148,12 @@ class AccountMove(models.Model):
     # For mail attached
     ei_attached_zip_base64_bytes = fields.Binary('Attached zip', attachment=True, copy=False, readonly=True,
                                                  states={'draft': [('readonly', False)]})
+    ei_attached_zip_checksum = fields.Char('Attached zip checksum', copy=False, readonly=True)
 
     # QR image
     ei_qr_image = fields.Binary("QR image", attachment=True, copy=False, readonly=True)
+    # Rendered from the QR data like the report, so it doesn't depend on the stored image being filled
+    ei_qr_image_preview = fields.Binary("QR image preview", attachment=False, compute='_compute_ei_qr_image_preview')
 
     # Total taxes only / without withholdings
     ei_amount_tax_withholding = fields.Monetary("Withholdings", compute="_compute_amount", store=True)
@@ -156,10 +192,22 @@ class AccountMove(models.Model):
     ei_is_correction_without_reference = fields.Boolean("Is it a correction without reference?", default=False,
                                                         readonly=True, states={'draft': [('readonly', False)]})
 
-    value_letters = fields.Char("Value in letters", compute="_compute_amount", store=True)
+    value_letters = fields.Char("Value in letters", compute="_compute_value_letters")
 
     is_attached_document_matched = fields.Boolean("Correct number in attached document?", copy=False,
                                                   compute='_is_attached_document_matched', store=True)
+
+    # Extracted once from the attached document, to filter and audit without decoding the XML
+    ei_attached_parent_document_id = fields.Char("Parent document ID (attached document)", copy=False,
+                                                 readonly=True, index=True,
+                                                 compute='_compute_ei_attached_document_info', store=True)
+    ei_attached_uuid = fields.Char("CUFE/CUDE (attached document)", copy=False, readonly=True, index=True,
+                                   compute='_compute_ei_attached_document_info', store=True)
+    ei_attached_issue_date = fields.Date("Issue date (attached document)", copy=False, readonly=True, index=True,
+                                         compute='_compute_ei_attached_document_info', store=True)
+    ei_attached_payable_amount = fields.Monetary("Payable amount (attached document)", copy=False, readonly=True,
+                                                 currency_field='currency_id',
+                                                 compute='_compute_ei_attached_document_info', store=True)
     ei_operation = fields.Selection([
         ('aiu', 'AIU'),
         ('standard', 'Standard'),
@@ -241,6 +289,46 @@ class AccountMove(models.Model):
                                                           email_layout_xmlid='mail.mail_notification_light')
         return True
 
+    def _send_edi_email_batch(self):
+        """Queue the e-invoice emails of the validated documents in the mail queue.
+
+        The PDFs are rendered in one go when the report stores them as attachments, so each email reuses its
+        attachment instead of rendering it again. The emails are sent by the mail queue, outside this transaction.
+        """
+        moves = self.filtered(lambda rec: not rec.is_edi_mail_sent and rec.company_id.enable_mass_send_print
+                              and rec.is_to_send_edi_email())
+        mail_template = self.env.ref('l10n_co_edi_jorels.email_template_edi', False)
+        if not moves or not mail_template:
+            return self.env['mail.mail']
+
+        start = time.perf_counter()
+
+        with self.env['l10n_co_edi_jorels.phase_stat']._measure(moves, 'email'):
+            report = mail_template.report_template
+            if report and report.attachment_use:
+                try:
+                    self.env['ir.actions.report']._render_qweb_pdf(report, moves.ids)
+                except Exception as e:
+                    _logger.debug("Unable to render the PDFs in batch: %s", e)
+
+            mail_template = mail_template.with_context(active_model='account.move')
+            mail_ids = []
+            for rec in moves:
+                mail_ids.append(mail_template.send_mail(res_id=rec.id, force_send=False,
+                                                        email_layout_xmlid='mail.mail_notification_light'))
+            moves.write({'is_edi_mail_sent': True})
+
+        # Wake the mail queue up instead of waiting for the next scheduled run
+        cron = self.env.ref('mail.ir_cron_mail_scheduler_action', False)
+        if cron:
+            cron._trigger()
+
+        total_time = time.perf_counter() - start
+        _logger.info("E-invoice emails: %s queued in %.2f s, throughput: %.2f emails/s",
+                     len(mail_ids), total_time, len(mail_ids) / total_time if total_time else 0.0)
+
+        return self.env['mail.mail'].browse(mail_ids)
+
     def _default_ei_type_environment(self):
         if not self.env['l10n_co_edi_jorels.type_environments'].search_count([]):
             self.env['res.company'].init_csv_data('l10n_co_edi_jorels.l10n_co_edi_jorels.type_environments')
@@ -287,13 +375,12 @@ class AccountMove(models.Model):
 
     def is_journal_pos(self):
         self.ensure_one()
-        try:
-            journal_pos_rec = self.env['pos.config'].search([
-                ('invoice_journal_id.id', '=', self.journal_id.id)
-            ])
-            return bool(journal_pos_rec)
-        except KeyError:
+        if self.journal_id._fields['is_pos_journal'].compute:
+            return self.journal_id.is_pos_journal
+        # Point of sale without l10n_co_edi_jorels_pos, the stored flag is not maintained
+        if 'pos.config' not in self.env:
             return False
+        return bool(self.env['pos.config'].search_count([('invoice_journal_id', '=', self.journal_id.id)], limit=1))
 
     @api.model
     def is_universal_discount(self):
@@ -325,6 +412,9 @@ class AccountMove(models.Model):
                 rec.ei_zip_name = response['zip_name']
                 rec.ei_signature = response['signature']
                 rec.ei_qr_code = response['qr_code']
+                if rec.ei_qr_data != response['qr_data']:
+                    # The image is rendered on demand or by the backfill
+                    rec.ei_qr_image = False
                 rec.ei_qr_data = response['qr_data']
                 rec.ei_qr_link = response['qr_link']
                 rec.ei_pdf_download_link = response['pdf_download_link']
@@ -334,25 +424,67 @@ class AccountMove(models.Model):
                 rec.ei_pdf_base64_bytes = response['pdf_base64_bytes']
                 rec.ei_zip_base64_bytes = response['zip_base64_bytes']
                 rec.ei_type_environment = response['type_environment_id']
-                rec.ei_payload = payload
-
-                # QR code
-                qr = qrcode.QRCode(
-                    version=1,
-                    error_correction=qrcode.constants.ERROR_CORRECT_M,
-                    box_size=2,
-                    border=2,
-                )
-                qr.add_data(rec.ei_qr_data)
-                qr.make(fit=True)
-                img = qr.make_image()
-                temp = BytesIO()
-                img.save(temp, format="PNG")
-                qr_image = base64.b64encode(temp.getvalue())
-                rec.ei_qr_image = qr_image
+                # Only rewrite the payload attachment when it changes, the status consultations keep it
+                if rec.ei_payload != payload:
+                    rec.ei_payload = payload
         except Exception as e:
             _logger.debug("Write response: %s", e)
 
+    @api.depends('ei_payload_file')
+    def _compute_ei_payload(self):
+        for rec in self:
+            rec.ei_payload = decompress_payload(rec.with_context(bin_size=False).ei_payload_file)
+
+    def _inverse_ei_payload(self):
+        for rec in self:
+            rec.ei_payload_file = compress_payload(rec.ei_payload)
+
+    @api.model
+    def _migrate_ei_payloads(self, batch_size=500, auto_commit=True):
+        """Move the payloads of the old inline column to compressed attachments"""
+        return migrate_inline_payloads(self, 'ei_payload', 'ei_payload_file', batch_size, auto_commit)
+
+    @api.depends('ei_qr_data')
+    def _compute_ei_qr_image_preview(self):
+        for rec in self:
+            image = rec.get_ei_qr_image('png')
+            rec.ei_qr_image_preview = base64.b64encode(image) if image else False
+
+    def get_ei_qr_image(self, fmt='png'):
+        self.ensure_one()
+        return render_qr(self.ei_qr_data, fmt)
+
+    def get_ei_qr_image_src(self, fmt='svg'):
+        self.ensure_one()
+        return render_qr_data_uri(self.ei_qr_data, fmt)
+
+    def action_render_ei_qr_image(self):
+        for rec in self.filtered(lambda move: move.ei_qr_data):
+            rec.ei_qr_image = base64.b64encode(rec.get_ei_qr_image('png'))
+        return True
+
+    @api.model
+    def _cron_backfill_ei_qr_images(self, batch_size=200, auto_commit=True):
+        """Render the stored QR image of the validated documents that don't have it yet"""
+        domain = [('ei_qr_data', '!=', False), ('ei_qr_image', '=', False)]
+        rendered = 0
+        last_id = 0
+        while True:
+            moves = self.search(domain + [('id', '>', last_id)], order='id', limit=batch_size)
+            if not moves:
+                break
+
+            moves.action_render_ei_qr_image()
+            rendered += len(moves)
+            last_id = moves[-1].id
+
+            if auto_commit:
+                self.env.cr.commit()
+            self.invalidate_model()
+
+        _logger.debug("QR images rendered: %s", rendered)
+        return rendered
+
     def get_type_document_identification_id(self):
         for rec in self:
             if rec.partner_id.type == 'invoice' and rec.partner_id.parent_id:
@@ -362,7 +494,60 @@ class AccountMove(models.Model):
 
             return rec_partner.type_document_identification_id.id
 
-    def get_ei_customer(self):
+    def _prefetch_ei_data(self):
+        """Load, for all the moves at once, the records read by get_ei_lines and get_ei_customer.
+
+        Every path is fetched for the whole recordset, so the number of queries doesn't depend on the number of
+        moves or lines. Returns the DIAN lookups used by get_ei_customer.
+        """
+        lines = self.invoice_line_ids
+        line_paths = [
+            'product_id.code',
+            'product_id.brand_name',
+            'product_id.model_name',
+            'product_id.lst_price',
+            'product_uom_id.edi_unit_measure_id',
+            'tax_ids.amount_type',
+            'tax_ids.edi_tax_class',
+        ]
+        if 'waypoint_id' in lines:
+            line_paths += [
+                'waypoint_id.number',
+                'waypoint_id.rndc_entry_code',
+                'waypoint_id.total',
+                'waypoint_id.weight',
+            ]
+        for path in line_paths:
+            lines.mapped(path)
+
+        partners = self.partner_id | self.partner_id.parent_id
+        for path in ('country_id.code', 'municipality_id', 'postal_municipality_id.code', 'type_regime_id',
+                     'type_liability_id', 'type_document_identification_id'):
+            partners.mapped(path)
+
+        return self._get_ei_customer_lookups(partners)
+
+    @api.model
+    def _get_ei_customer_lookups(self, partners):
+        """DIAN country and municipality ids by code, for the given partners"""
+        countries_env = self.env['l10n_co_edi_jorels.countries']
+        municipalities_env = self.env['l10n_co_edi_jorels.municipalities']
+        return {
+            'countries': {code: countries_env._get_id_by_code(code)
+                          for code in partners.country_id.mapped('code') if code},
+            'municipalities': {code: municipalities_env._get_id_by_code(code)
+                               for code in partners.postal_municipality_id.mapped('code') if code},
+        }
+
+    def get_ei_customer_bulk(self):
+        lookups = self._prefetch_ei_data()
+        return {rec.id: rec.get_ei_customer(lookups) for rec in self}
+
+    def get_ei_lines_bulk(self):
+        self._prefetch_ei_data()
+        return {rec.id: rec.get_ei_lines() for rec in self}
+
+    def get_ei_customer(self, lookups=None):
         for rec in self:
             if rec.partner_id.type == 'invoice' and rec.partner_id.parent_id:
                 rec_partner = rec.partner_id.parent_id
@@ -417,12 +602,13 @@ class AccountMove(models.Model):
                         if rec_partner.trade_name:
                             customer_data['trade_name'] = rec_partner.trade_name
 
+                        if lookups is None:
+                            lookups = self._get_ei_customer_lookups(rec_partner)
+
                         if rec_partner.country_id:
-                            customer_rec = self.env['l10n_co_edi_jorels.countries'].search(
-                                [('code', '=', rec_partner.country_id.code)]
-                            )
-                            if customer_rec:
-                                customer_data['country_code'] = customer_rec.id
+                            country_id = lookups['countries'].get(rec_partner.country_id.code)
+                            if country_id:
+                                customer_data['country_code'] = country_id
                             else:
                                 raise UserError(_("You must assign the client a valid country"))
                         else:
@@ -435,9 +621,8 @@ class AccountMove(models.Model):
                             if rec_partner.municipality_id:
                                 customer_data['municipality_code'] = rec_partner.municipality_id.id
                             elif rec_partner.postal_municipality_id:
-                                municipality_rec = self.env['l10n_co_edi_jorels.municipalities'].search(
-                                    [('code', '=', rec_partner.postal_municipality_id.code)])
-                                customer_data['municipality_code'] = municipality_rec.id
+                                customer_data['municipality_code'] = lookups['municipalities'].get(
+                                    rec_partner.postal_municipality_id.code, False)
                             else:
                                 raise UserError(_("You must assign the client a municipality"))
 
@@ -596,13 +781,8 @@ class AccountMove(models.Model):
                     tax_total = {}
 
                     if invoice_line_tax_id.edi_tax_id.id:
-                        edi_tax_name = invoice_line_tax_id.edi_tax_id.name
-                        tax_name = invoice_line_tax_id.name
-                        dian_report_tax_base = invoice_line_tax_id.dian_report_tax_base or 'auto'
                         # The information sent to DIAN should not include the withholdings
-                        if edi_tax_name[:4] != 'Rete' \
-                                and not tax_name.startswith(('IVA Excluido', 'IVA Compra Excluido')) \
-                                and not (edi_tax_name == 'IVA' and dian_report_tax_base == 'no_report'):
+                        if invoice_line_tax_id.edi_tax_class == 'reported':
                             if invoice_line_tax_id.amount_type == 'percent':
                                 tax_total.update({'code': invoice_line_tax_id.edi_tax_id.id})
                                 tax_total.update({'tax_value': round_curr(
@@ -759,9 +939,6 @@ class AccountMove(models.Model):
                         taxable_amount_company = invoice_line_id.product_id.lst_price * invoice_line_id.quantity
 
                     for invoice_line_tax_id in invoice_line_id.tax_ids:
-                        tax_name = invoice_line_tax_id.name
-                        dian_report_tax_base = invoice_line_tax_id.dian_report_tax_base or 'auto'
-
                         if invoice_line_tax_id.amount_type == 'fixed':
                             # For fixed amount type
                             # The 'amount' field automatically uses the value defined in the tax configuration
@@ -773,31 +950,17 @@ class AccountMove(models.Model):
                             tax_amount = taxable_amount * invoice_line_tax_id.amount / 100.0
                             tax_amount_company = taxable_amount_company * invoice_line_tax_id.amount / 100.0
 
-                        if invoice_line_tax_id.edi_tax_id.id:
-                            edi_tax_name = invoice_line_tax_id.edi_tax_id.name
-                            if tax_name.startswith(('IVA Excluido', 'IVA Compra Excluido')) or \
-                                    (edi_tax_name == 'IVA' and dian_report_tax_base == 'no_report'):
-                                amount_excluded = amount_excluded + taxable_amount
-                                amount_excluded_company = amount_excluded_company + taxable_amount_company
-                            elif edi_tax_name[:4] == 'Rete':
-                                amount_tax_withholding = amount_tax_withholding + tax_amount
-                                amount_tax_withholding_company = amount_tax_withholding_company + tax_amount_company
-                            else:
-                                amount_tax_no_withholding = amount_tax_no_withholding + tax_amount
-                                amount_tax_no_withholding_company = (amount_tax_no_withholding_company +
-                                                                     tax_amount_company)
+                        tax_class = invoice_line_tax_id.edi_tax_class
+                        if tax_class in ('excluded', 'not_reported'):
+                            amount_excluded = amount_excluded + taxable_amount
+                            amount_excluded_company = amount_excluded_company + taxable_amount_company
+                        elif tax_class == 'withholding':
+                            amount_tax_withholding = amount_tax_withholding + tax_amount
+                            amount_tax_withholding_company = amount_tax_withholding_company + tax_amount_company
                         else:
-                            if tax_name.startswith(('IVA Excluido', 'IVA Compra Excluido')) or \
-                                    (tax_name.startswith('IVA') and dian_report_tax_base == 'no_report'):
-                                amount_excluded = amount_excluded + taxable_amount
-                                amount_excluded_company = amount_excluded_company + taxable_amount_company
-                            elif tax_name[:3] == 'Rte':
-                                amount_tax_withholding = amount_tax_withholding + tax_amount
-                                amount_tax_withholding_company = amount_tax_withholding_company + tax_amount_company
-                            else:
-                                amount_tax_no_withholding = amount_tax_no_withholding + tax_amount
-                                amount_tax_no_withholding_company = (amount_tax_no_withholding_company +
-                                                                     tax_amount_company)
+                            amount_tax_no_withholding = amount_tax_no_withholding + tax_amount
+                            amount_tax_no_withholding_company = (amount_tax_no_withholding_company +
+                                                                 tax_amount_company)
 
             rec.ei_amount_tax_withholding = amount_tax_withholding
             rec.ei_amount_tax_withholding_company = amount_tax_withholding_company
@@ -827,22 +990,18 @@ class AccountMove(models.Model):
                                                               rec.ei_amount_tax_no_withholding_company -
                                                               rec.ks_amount_discount)
 
-            # Value in letters
-            decimal_part, integer_part = math.modf(abs(rec.amount_total_signed))
-            if decimal_part:
-                decimal_part = round(decimal_part * math.pow(10, rec.company_currency_id.decimal_places))
-            if integer_part:
-                if rec.company_id.ei_enable:
-                    lang = 'es_CO'
-                else:
-                    lang = rec.partner_id.lang if rec.partner_id.lang else 'en'
+    @api.depends('amount_total_signed', 'company_currency_id', 'company_id.ei_enable', 'partner_id.lang')
+    def _compute_value_letters(self):
+        # Not stored: only computed when printed or sent
+        for rec in self:
+            if rec.company_id.ei_enable:
+                lang = 'es_CO'
+            else:
+                lang = rec.partner_id.lang if rec.partner_id.lang else 'en'
 
-                rec.value_letters = (num2words(integer_part, lang=lang).upper() + ' ' +
-                                     rec.company_currency_id.currency_unit_label.upper())
-                if decimal_part:
-                    rec.value_letters = (rec.value_letters + ', ' +
-                                         num2words(decimal_part, lang=lang).upper() + ' ' +
-                                         rec.company_currency_id.currency_subunit_label.upper() + '.')
+            currency = rec.company_currency_id
+            rec.value_letters = amount_to_words(abs(rec.amount_total_signed), lang, currency.currency_unit_label,
+                                                currency.currency_subunit_label, currency.decimal_places)
 
     def get_ei_payment_form(self):
         for rec in self:
@@ -947,31 +1106,33 @@ class AccountMove(models.Model):
             if type_edi_document == 'invoice':
                 # Sales invoice
                 if not rec.is_out_country:
-                    type_documents_rec = type_documents_env.search([('code', '=', '01')])
+                    type_documents_id = type_documents_env._get_id_by_code('01')
                 else:
-                    type_documents_rec = type_documents_env.search([('code', '=', '02')])
+                    type_documents_id = type_documents_env._get_id_by_code('02')
             elif type_edi_document == 'credit_note':
                 # Credit note
-                type_documents_rec = type_documents_env.search([('code', '=', '91')])
+                type_documents_id = type_documents_env._get_id_by_code('91')
             elif type_edi_document == 'debit_note':
                 # Debit note
-                type_documents_rec = type_documents_env.search([('code', '=', '92')])
+                type_documents_id = type_documents_env._get_id_by_code('92')
             elif type_edi_document == 'doc_support':
                 # Document support
-                type_documents_rec = type_documents_env.search([('code', '=', '05')])
+                type_documents_id = type_documents_env._get_id_by_code('05')
             elif type_edi_document == 'note_support':
                 # Note Document Support
-                type_documents_rec = type_documents_env.search([('code', '=', '95')])
+                type_documents_id = type_documents_env._get_id_by_code('95')
             else:
-                type_documents_rec = None
+                type_documents_id = None
 
             # Store compute fields
             rec.ei_type_document = type_edi_document
-            rec.ei_type_document_id = type_documents_rec.id if type_documents_rec else None
+            rec.ei_type_document_id = type_documents_id or None
 
     def get_ei_sync(self):
         self.ensure_one()
-        self.ei_sync = self.ei_is_not_test
+        # Only write on change, so the payload cache key is kept
+        if self.ei_sync != self.ei_is_not_test:
+            self.ei_sync = self.ei_is_not_test
         return self.ei_sync
 
     def get_ei_is_not_test(self):
@@ -1064,7 +1225,93 @@ class AccountMove(models.Model):
         else:
             return operation[self.ei_operation]
 
-    def get_json_request(self):
+    def _get_json_request_key(self):
+        """Hash of everything the payload is built from, it changes when any of those records is written.
+
+        The write dates are the timestamp of the transaction, so they don't change with later writes in the same
+        transaction: when a record was written in the current transaction there is no key and no caching. So the
+        transaction that posts a document never hits the cache, the cache only serves later requests of the same
+        document (previews, retries, batch resends).
+        """
+        self.ensure_one()
+
+        lines = self.invoice_line_ids
+        dependencies = [
+            self,
+            lines,
+            lines.product_id,
+            lines.product_id.product_tmpl_id,
+            lines.product_uom_id,
+            lines.product_uom_id.edi_unit_measure_id,
+            lines.tax_ids,
+            lines.tax_ids.edi_tax_id,
+            self.partner_id,
+            self.partner_id.parent_id,
+            self.resolution_id,
+            self.company_id,
+            self.journal_id,
+            self.currency_id,
+            self.reversed_entry_id,
+        ]
+        if self.is_debit_note_module():
+            dependencies.append(self.debit_origin_id)
+        if 'waypoint_id' in lines:
+            dependencies.append(lines.waypoint_id)
+
+        key = [
+            self.env.cr.dbname,
+            self.env.context.get('lang'),
+            fields.Date.to_string(fields.Date.context_today(self)),
+            self.currency_id.with_context(dict(self._context or {}, date=self.invoice_date)).rate,
+        ]
+        now = self.env.cr.now()
+        for records in dependencies:
+            write_dates = [(record.id, record.write_date) for record in records]
+            if any(write_date and write_date >= now for record_id, write_date in write_dates):
+                return None
+            key.append((records._name, tuple((record_id, str(write_date)) for record_id, write_date in write_dates)))
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def _prepare_json_request(self):
+        """Writes the payload depends on, done on every request even when the payload comes from the cache"""
+        for rec in self:
+            if rec.should_send_document_to_dian():
+                if not rec.ei_number or not rec.number_formatted:
+                    rec.compute_number_formatted()
+                rec.get_ei_sync()
+                if rec.ei_type_document in ('credit_note', 'note_support', 'debit_note'):
+                    rec.compute_ei_correction_concept_id()
+
+    @api.model
+    def get_json_request_cache_stats(self):
+        hits = _json_request_cache_stats['hits']
+        misses = _json_request_cache_stats['misses']
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'size': len(_json_request_cache),
+        }
+
+    def get_json_request(self, lookups=None):
+        for rec in self:
+            rec._prepare_json_request()
+            key = rec._get_json_request_key()
+            if key is None:
+                return rec._build_json_request(lookups)
+
+            json_request = _json_request_cache.get(key)
+            if json_request is not None:
+                _json_request_cache_stats['hits'] += 1
+            else:
+                _json_request_cache_stats['misses'] += 1
+                json_request = rec._build_json_request(lookups)
+                _json_request_cache[key] = json_request
+            _logger.debug("Payload cache: %s", rec.get_json_request_cache_stats())
+
+            return deepcopy(json_request)
+
+    def _build_json_request(self, lookups=None):
         for rec in self:
             if rec.should_send_document_to_dian():
                 # Important for compatibility with old fields,
@@ -1081,7 +1328,7 @@ class AccountMove(models.Model):
                     'number': rec.ei_number,
                     'type_document_code': rec.ei_type_document_id.id,
                     'sync': rec.get_ei_sync(),
-                    'customer': rec.get_ei_customer(),
+                    'customer': rec.get_ei_customer(lookups),
                     'operation_code': rec.get_operation_code()
                 }
 
@@ -1138,18 +1385,18 @@ class AccountMove(models.Model):
                                           'Set it up in the Journals configuration view in Odoo.'))
 
                     type_currencies_env = self.env['l10n_co_edi_jorels.type_currencies']
-                    company_currency_search = type_currencies_env.search([('code', '=', company_currency_code)])
-                    invoice_currency_search = type_currencies_env.search([('code', '=', invoice_currency_code)])
+                    company_currency_id = type_currencies_env._get_id_by_code(company_currency_code)
+                    invoice_currency_id = type_currencies_env._get_id_by_code(invoice_currency_code)
 
                     # The if is to make sure the name in currency_id,
                     # have a match in the code in type_currencies of the DIAN
-                    if company_currency_search and invoice_currency_search:
+                    if company_currency_id and invoice_currency_id:
                         rate_date = rec.date or rec.invoice_date or fields.Date.context_today(self)
                         rate = rec.currency_id.with_context(dict(rec._context or {}, date=rec.invoice_date)).rate
 
-                        json_request['currency_code'] = company_currency_search.id
+                        json_request['currency_code'] = company_currency_id
                         json_request['exchange_rate'] = {
-                            'code': invoice_currency_search.id,
+                            'code': invoice_currency_id,
                             'rate': rate,
                             'date': str(rate_date)
                         }
@@ -1237,122 +1484,242 @@ class AccountMove(models.Model):
 
             return json_request
 
+    def _prepare_dian_request(self, is_test, lookups=None):
+        """Build the Edipo request of a document, False when it doesn't need to be sent"""
+        self.ensure_one()
+
+        type_edi_document = self.ei_type_document
+        if not self.is_pending_to_send_to_dian():
+            return False
+
+        requests_data = self.get_json_request(lookups)
+
+        if self.company_id.api_key:
+            token = self.company_id.api_key
+        else:
+            raise UserError(_("You must configure a token"))
+
+        api_url = self.env['ir.config_parameter'].sudo().get_param('jorels.edipo.api_url',
+                                                                   'https://edipo.jorels.com')
+        params = {'token': token}
+        header = {
+            "accept": "application/json",
+            "Content-Type": "application/json"
+        }
+
+        if self.is_out_country:
+            params['export'] = True
+
+        api_url = api_url + "/" + type_edi_document
+
+        if is_test or not self.ei_is_not_test:
+            if type_edi_document in ('doc_support', 'note_support'):
+                raise UserError(
+                    _("The support document does not support test submissions, only production."))
+            if self.company_id.test_set_id:
+                test_set_id = self.company_id.test_set_id
+                params['test_set_id'] = test_set_id
+            else:
+                raise UserError(_("You have not configured a 'TestSetId'."))
+
+        _logger.debug('API URL: %s', api_url)
+
+        num_attemps = int(self.env['ir.config_parameter'].sudo().get_param('jorels.edipo.num_attemps', '2'))
+        if is_test or not self.ei_is_not_test:
+            num_attemps = 1
+
+        return {
+            'url': api_url,
+            'data': requests_data,
+            'params': params,
+            'headers': header,
+            'num_attemps': num_attemps,
+        }
+
+    @api.model
+    def _send_dian_request(self, request):
+        """Post a request built by _prepare_dian_request. It doesn't use the ORM, so it is safe in threads"""
+        response = {}
+        for i in range(request['num_attemps']):
+            if i:
+                time.sleep(http_client.backoff(i))
+            try:
+                response = http_client.post(request['url'],
+                                            json.dumps(request['data']),
+                                            headers=request['headers'],
+                                            params=request['params'],
+                                            retries=0).json()
+            except CircuitOpenError as e:
+                _logger.warning("Invalid response: %s", e)
+                break
+            except Exception as e:
+                _logger.warning("Invalid response: %s", e)
+                continue
+
+            _logger.debug('API Response: %s', response)
+
+            if 'is_valid' in response and response['is_valid']:
+                break
+        return response
+
+    def _process_dian_response(self, response, requests_data):
+        self.ensure_one()
+
+        if 'detail' in response:
+            raise UserError(response['detail'])
+        if 'message' in response:
+            if response['message'] == 'Unauthenticated.' or response['message'] == '':
+                raise UserError(_("Authentication error with the API"))
+            else:
+                if 'errors' in response:
+                    raise UserError(response['message'] + '/ errors: ' + str(response['errors']))
+                else:
+                    raise UserError(response['message'])
+        elif 'is_valid' in response:
+            self.write_response(response, json.dumps(requests_data, indent=2, sort_keys=False))
+            if response['is_valid']:
+                # self.env.user.notify_success(message=_("The validation at DIAN has been successful."))
+                _logger.debug("The validation at DIAN has been successful.")
+            elif 'uuid' in response:
+                if response['uuid'] != "":
+                    if not self.ei_is_not_test:
+                        # self.env.user.notify_success(message=_("Document sent to DIAN in habilitation."))
+                        _logger.debug("Document sent to DIAN in habilitation.")
+                    else:
+                        temp_message = {self.ei_status_message, self.ei_errors_messages,
+                                        self.ei_status_description, self.ei_status_code}
+                        raise UserError(str(temp_message))
+                else:
+                    raise UserError(_('A valid UUID was not obtained. Try again.'))
+            else:
+                raise UserError(_('The document could not be validated in DIAN.'))
+        else:
+            raise UserError(_("No logical response was obtained from the API."))
+
+    def _dian_validation_failed(self, error, raise_error=True):
+        self.ensure_one()
+        _logger.debug("Failed to process the request for document: %s: %s", self.name, error)
+        if raise_error and not self.company_id.ei_always_validate:
+            raise UserError(_("Failed to process the request for document: %s: %s") % (self.name, error))
+        else:
+            self.message_post(body=_("DIAN Electronic invoicing: "
+                                     "Failed to process the request for document: %s: %s") % (self.name, error))
+
+    def _after_dian_validation(self, is_test):
+        self.ensure_one()
+
+        if not is_test and not self.ei_attached_document_base64_bytes:
+            with self.env['l10n_co_edi_jorels.phase_stat']._measure(self, 'status_log'):
+                self.status_document_log()
+                self.flush_recordset()
+            if not self.ei_attached_document_base64_bytes:
+                _logger.error('Unable to obtain an attached document.')
+
+        # The email is sent afterwards, along with the other validated documents, see _send_edi_email_batch
+
     def validate_dian_generic(self, is_test):
+        phase_stat_env = self.env['l10n_co_edi_jorels.phase_stat']
         for rec in self:
             try:
                 if not rec.company_id.ei_enable:
                     continue
 
                 # raise UserError(json.dumps(rec.get_json_request(), indent=2, sort_keys=False))
-                _logger.debug("DIAN Validation Request: %s",
-                              json.dumps(rec.get_json_request(), indent=2, sort_keys=False))
+                if _logger.isEnabledFor(logging.DEBUG):
+                    _logger.debug("DIAN Validation Request: %s",
+                                  json.dumps(rec.get_json_request(), indent=2, sort_keys=False))
 
                 if rec.state == 'draft':
                     raise UserError(_("The invoice must first be validated in Odoo, before being sent to the DIAN."))
 
-                type_edi_document = rec.ei_type_document
-                if rec.is_pending_to_send_to_dian():
-                    requests_data = rec.get_json_request()
+                with phase_stat_env._measure(rec, 'json_request'):
+                    request = rec._prepare_dian_request(is_test)
+                if request:
+                    with phase_stat_env._measure(rec, 'http'):
+                        response = self._send_dian_request(request)
+                    with phase_stat_env._measure(rec, 'write_response'):
+                        rec._process_dian_response(response, request['data'])
+                        rec.flush_recordset()
+                else:
+                    _logger.debug("This document does not need to be sent to the DIAN")
+            except Exception as e:
+                rec._dian_validation_failed(e)
 
-                    if rec.company_id.api_key:
-                        token = rec.company_id.api_key
-                    else:
-                        raise UserError(_("You must configure a token"))
-
-                    api_url = self.env['ir.config_parameter'].sudo().get_param('jorels.edipo.api_url',
-                                                                               'https://edipo.jorels.com')
-                    params = {'token': token}
-                    header = {
-                        "accept": "application/json",
-                        "Content-Type": "application/json"
-                    }
+            rec._after_dian_validation(is_test)
 
-                    if rec.is_out_country:
-                        params['export'] = True
+        self._send_edi_email_batch()
 
-                    api_url = api_url + "/" + type_edi_document
+    def validate_dian_batch(self, is_test=False):
+        """Validate many documents at once.
 
-                    if is_test or not rec.ei_is_not_test:
-                        if type_edi_document in ('doc_support', 'note_support'):
-                            raise UserError(
-                                _("The support document does not support test submissions, only production."))
-                        if rec.company_id.test_set_id:
-                            test_set_id = rec.company_id.test_set_id
-                            params['test_set_id'] = test_set_id
-                        else:
-                            raise UserError(_("You have not configured a 'TestSetId'."))
+        The requests are built in the current thread, only the HTTP requests to the API are spread over a bounded
+        pool of threads ('jorels.edipo.max_workers'), then all the responses are written back here. Errors are
+        posted in the chatter of each document, so one wrong document doesn't roll back the whole batch.
+        """
+        start = time.perf_counter()
 
-                    _logger.debug('API URL: %s', api_url)
+        lookups = self._prefetch_ei_data()
+        phase_stat_env = self.env['l10n_co_edi_jorels.phase_stat']
 
-                    num_attemps = int(self.env['ir.config_parameter'].sudo().get_param('jorels.edipo.num_attemps', '2'))
-                    if is_test or not rec.ei_is_not_test:
-                        num_attemps = 1
+        jobs = []
+        for rec in self:
+            if not rec.company_id.ei_enable or rec.state == 'draft':
+                continue
+            try:
+                with phase_stat_env._measure(rec, 'json_request'):
+                    request = rec._prepare_dian_request(is_test, lookups)
+                if request:
+                    jobs.append((rec, request))
+            except Exception as e:
+                rec._dian_validation_failed(e, raise_error=False)
+
+        max_workers = int(self.env['ir.config_parameter'].sudo().get_param('jorels.edipo.max_workers', '4'))
+        send_dian_request = self._send_dian_request
+
+        def timed_send(request):
+            send_start = time.perf_counter()
+            response = send_dian_request(request)
+            return response, time.perf_counter() - send_start
+
+        results = []
+        if jobs:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+                results = list(executor.map(timed_send, [request for rec, request in jobs]))
+
+        valid = 0
+        for (rec, request), (response, elapsed) in zip(jobs, results):
+            _logger.info("DIAN batch validation: %s answered in %.3f s", rec.name, elapsed)
+            if phase_stat_env._is_enabled():
+                phase_stat_env._record(rec, 'http', elapsed)
+            try:
+                with phase_stat_env._measure(rec, 'write_response'):
+                    rec._process_dian_response(response, request['data'])
+                    rec.flush_recordset()
+            except Exception as e:
+                rec._dian_validation_failed(e, raise_error=False)
+            if rec.ei_is_valid:
+                valid += 1
 
-                    for i in range(num_attemps):
-                        try:
-                            response = requests.post(api_url,
-                                                     json.dumps(requests_data),
-                                                     headers=header,
-                                                     params=params).json()
-                        except Exception as e:
-                            _logger.warning("Invalid response: %s", e)
+        for rec, request in jobs:
+            rec._after_dian_validation(is_test)
 
-                        _logger.debug('API Response: %s', response)
+        self.browse([rec.id for rec, request in jobs])._send_edi_email_batch()
 
-                        if 'is_valid' in response and response['is_valid']:
-                            break
+        total_time = time.perf_counter() - start
+        throughput = len(jobs) / total_time if total_time else 0.0
+        message = _("%s of %s documents sent to DIAN are valid. Total time: %.2f s, throughput: %.2f documents/s") % (
+            valid, len(jobs), total_time, throughput)
+        _logger.info("DIAN batch validation: %s", message)
 
-                    if 'detail' in response:
-                        raise UserError(response['detail'])
-                    if 'message' in response:
-                        if response['message'] == 'Unauthenticated.' or response['message'] == '':
-                            raise UserError(_("Authentication error with the API"))
-                        else:
-                            if 'errors' in response:
-                                raise UserError(response['message'] + '/ errors: ' + str(response['errors']))
-                            else:
-                                raise UserError(response['message'])
-                    elif 'is_valid' in response:
-                        rec.write_response(response, json.dumps(requests_data, indent=2, sort_keys=False))
-                        if response['is_valid']:
-                            # self.env.user.notify_success(message=_("The validation at DIAN has been successful."))
-                            _logger.debug("The validation at DIAN has been successful.")
-                        elif 'uuid' in response:
-                            if response['uuid'] != "":
-                                if not rec.ei_is_not_test:
-                                    # self.env.user.notify_success(message=_("Document sent to DIAN in habilitation."))
-                                    _logger.debug("Document sent to DIAN in habilitation.")
-                                else:
-                                    temp_message = {rec.ei_status_message, rec.ei_errors_messages,
-                                                    rec.ei_status_description, rec.ei_status_code}
-                                    raise UserError(str(temp_message))
-                            else:
-                                raise UserError(_('A valid UUID was not obtained. Try again.'))
-                        else:
-                            raise UserError(_('The document could not be validated in DIAN.'))
-                    else:
-                        raise UserError(_("No logical response was obtained from the API."))
-                else:
-                    _logger.debug("This document does not need to be sent to the DIAN")
-            except Exception as e:
-                _logger.debug("Failed to process the request for document: %s: %s", (rec.name, e))
-                if not rec.company_id.ei_always_validate:
-                    raise UserError(_("Failed to process the request for document: %s: %s") % (rec.name, e))
-                else:
-                    rec.message_post(body=_("DIAN Electronic invoicing: "
-                                            "Failed to process the request for document: %s: %s") % (rec.name, e))
-
-            if not is_test and not rec.ei_attached_document_base64_bytes:
-                rec.status_document_log()
-                if not rec.ei_attached_document_base64_bytes:
-                    _logger.error('Unable to obtain an attached document.')
-
-            if not rec.is_edi_mail_sent and rec.company_id.enable_mass_send_print and rec.is_to_send_edi_email():
-                try:
-                    rec.mass_send_print()
-                except Exception:
-                    rec._send_edi_email()
-                rec.write({'is_edi_mail_sent': True})
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("DIAN batch validation"),
+                'message': message,
+                'sticky': False,
+            }
+        }
 
     def validate_dian(self):
         for rec in self:
@@ -1393,6 +1760,14 @@ class AccountMove(models.Model):
             if to_electronic_invoices:
                 to_electronic_invoices.filtered(lambda inv: inv.write({'ei_is_not_test': inv.company_id.is_not_test}))
 
+                # Background validation, the invoices are posted now and sent by the submission queue
+                to_queue_invoices = to_electronic_invoices.filtered(lambda inv: inv.company_id.ei_async_validation)
+                if to_queue_invoices:
+                    queue_env = self.env['l10n_co_edi_jorels.submission_queue'].sudo()
+                    queue_env.enqueue(to_queue_invoices.filtered(lambda inv: inv.ei_is_not_test), is_test=False)
+                    queue_env.enqueue(to_queue_invoices.filtered(lambda inv: not inv.ei_is_not_test), is_test=True)
+                    to_electronic_invoices -= to_queue_invoices
+
                 # Production invoices
                 to_production_invoices = to_electronic_invoices.filtered(lambda inv: inv.ei_is_not_test)
                 if to_production_invoices:
@@ -1440,10 +1815,11 @@ class AccountMove(models.Model):
 
                         _logger.debug('API URL: %s', api_url)
 
-                        response = requests.post(api_url,
-                                                 json.dumps(requests_data),
-                                                 headers=header,
-                                                 params=params).json()
+                        response = http_client.post(api_url,
+                                                    json.dumps(requests_data),
+                                                    headers=header,
+                                                    params=params,
+                                                    idempotent=True).json()
                         _logger.debug('API Response: %s', response)
 
                         if 'detail' in response:
@@ -1514,10 +1890,11 @@ class AccountMove(models.Model):
 
                         _logger.debug('API URL: %s', api_url)
 
-                        response = requests.post(api_url,
-                                                 json.dumps(requests_data),
-                                                 headers=header,
-                                                 params=params).json()
+                        response = http_client.post(api_url,
+                                                    json.dumps(requests_data),
+                                                    headers=header,
+                                                    params=params,
+                                                    idempotent=True).json()
                         _logger.debug('API Response: %s', response)
 
                         if 'detail' in response:
@@ -1555,8 +1932,9 @@ class AccountMove(models.Model):
                                         rec.ei_zip_name = json_request['zip_name']
                                     if json_request['xml_base64_bytes']:
                                         rec.ei_xml_base64_bytes = json_request['xml_base64_bytes']
-                                    if json_request['qr_data']:
+                                    if json_request['qr_data'] and rec.ei_qr_data != json_request['qr_data']:
                                         rec.ei_qr_data = json_request['qr_data']
+                                        rec.ei_qr_image = False
                                     if json_request['application_response_base64_bytes']:
                                         rec.ei_application_response_base64_bytes = json_request[
                                             'application_response_base64_bytes']
@@ -1570,21 +1948,6 @@ class AccountMove(models.Model):
                                     if json_request['signature']:
                                         rec.ei_signature = json_request['signature']
 
-                                        # QR code
-                                        qr = qrcode.QRCode(
-                                            version=1,
-                                            error_correction=qrcode.constants.ERROR_CORRECT_M,
-                                            box_size=2,
-                                            border=2,
-                                        )
-                                        qr.add_data(rec.ei_qr_data)
-                                        qr.make(fit=True)
-                                        img = qr.make_image()
-                                        temp = BytesIO()
-                                        img.save(temp, format="PNG")
-                                        qr_image = base64.b64encode(temp.getvalue())
-                                        rec.ei_qr_image = qr_image
-
                                     success = True
                                     break
                             if success:
@@ -1619,143 +1982,265 @@ class AccountMove(models.Model):
                 rec.message_post(body=_("Log DIAN Electronic invoicing: "
                                         "Failed to process the request for document: %s: %s") % (rec.name, e))
 
+    def init(self):
+        super(AccountMove, self).init()
+        self.env['l10n_co_edi_jorels.status_sweep']._create_pending_index(self, 'ei_is_valid', 'ei_zip_key', 'ei_uuid')
+        # Supplier documents still without UUID, consulted by the Nimbus synchronization
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS account_move_nimbus_pending_idx ON account_move (id)
+            WHERE move_type IN ('in_invoice', 'in_refund') AND ei_uuid IS NULL AND ref IS NOT NULL
+        """)
+
+    @api.model
+    def _get_dian_status_fields(self):
+        return 'ei_is_valid', 'ei_zip_key', 'ei_uuid'
+
+    @api.model
+    def _get_dian_status_pending_domain(self):
+        return [('state', '=', 'posted'), ('company_id.ei_enable', '=', True)]
+
+    def _prepare_dian_status_request(self):
+        self.ensure_one()
+        if not self.company_id.api_key or not self.should_send_document_to_dian():
+            return False
+        return self.env['l10n_co_edi_jorels.status_sweep']._prepare_status_request(
+            self.company_id.api_key, 1 if self.ei_is_not_test else 2, self.ei_zip_key, self.ei_uuid)
+
+    def _apply_dian_status_response(self, response):
+        self.ensure_one()
+        # The stored payload is kept, the status consultation doesn't rebuild it
+        self.write_response(response, self.ei_payload)
+
+    @api.model
+    def _cron_reconcile_dian_status(self):
+        sweep_env = self.env['l10n_co_edi_jorels.status_sweep']
+        sweep_env._run('account.move')
+        sweep_env._run('l10n_co_edi_jorels.radian')
+
     @api.depends('ei_attached_document_base64_bytes')
+    def _compute_ei_attached_document_info(self):
+        for rec in self:
+            info = parse_attached_document(rec.with_context(bin_size=False).ei_attached_document_base64_bytes)
+            rec.ei_attached_parent_document_id = info['parent_document_id']
+            rec.ei_attached_uuid = info['uuid']
+            rec.ei_attached_issue_date = info['issue_date']
+            rec.ei_attached_payable_amount = info['payable_amount']
+
+    @api.depends('ei_attached_parent_document_id', 'number_formatted')
     def _is_attached_document_matched(self):
         for rec in self:
             if not rec.company_id.ei_enable:
                 continue
 
-            if rec.ei_attached_document_base64_bytes:
-                with BytesIO(base64.b64decode(rec.ei_attached_document_base64_bytes)) as file:
-                    search_ok = False
-                    for line in file:
-                        search_string = '<cbc:ParentDocumentID>' + rec.number_formatted + '</cbc:ParentDocumentID>'
-                        if search_string in str(line):
-                            search_ok = True
-                            break
-                    rec.is_attached_document_matched = search_ok
-            else:
-                rec.is_attached_document_matched = False
+            rec.is_attached_document_matched = bool(rec.ei_attached_parent_document_id) \
+                and rec.ei_attached_parent_document_id == rec.number_formatted
 
     def create_radian_default_events(self):
-        search_env = self.env['l10n_co_edi_jorels.radian']
+        radian_env = self.env['l10n_co_edi_jorels.radian']
 
+        wanted = []
         for rec in self:
-            if rec.move_type in ('out_invoice', 'out_refund') and rec.payment_form_id.id == 2:
-                event_type = 'customer'
-
-                # Tacit acceptance
-                search_rec = search_env.search([('move_id', '=', rec.id), ('event_id', '=', 7)])
-                if not search_rec:
-                    search_env.create({
-                        'move_id': rec.id,
-                        'event_id': 7,
-                        'type': event_type,
-                    })
+            if rec.move_type in RADIAN_DEFAULT_EVENTS and rec.payment_form_id.id == 2:
+                event_type, event_ids = RADIAN_DEFAULT_EVENTS[rec.move_type]
+                wanted += [(rec.id, event_id, event_type) for event_id in event_ids]
+        if not wanted:
+            return radian_env
+
+        # The existing (move, event) pairs, with one query for all the moves
+        radian_env.flush_model(['move_id', 'event_id'])
+        self._cr.execute("""
+            SELECT move_id, event_id FROM l10n_co_edi_jorels_radian WHERE move_id IN %s
+        """, (tuple({move_id for move_id, event_id, event_type in wanted}),))
+        existing = set(self._cr.fetchall())
+
+        return radian_env.create([{
+            'move_id': move_id,
+            'event_id': event_id,
+            'type': event_type,
+        } for move_id, event_id, event_type in wanted if (move_id, event_id) not in existing])
 
-            if rec.move_type in ('in_invoice', 'in_refund') and rec.payment_form_id.id == 2:
-                event_type = 'supplier'
+    @api.model
+    def _cron_create_radian_default_events(self, date_from=None, date_to=None, batch_size=1000, auto_commit=True):
+        """Create the missing default RADIAN events of the credit documents issued between two dates.
+
+        Without dates, it covers the last days set in 'jorels.edipo.radian_events_days' (30 by default).
+        """
+        if date_to is None:
+            date_to = fields.Date.context_today(self)
+        if date_from is None:
+            days = int(self.env['ir.config_parameter'].sudo().get_param('jorels.edipo.radian_events_days', '30'))
+            date_from = fields.Date.subtract(fields.Date.to_date(date_to), days=days)
+
+        domain = [
+            ('state', '=', 'posted'),
+            ('move_type', 'in', list(RADIAN_DEFAULT_EVENTS)),
+            ('payment_form_id', '=', 2),
+            ('company_id.ei_enable', '=', True),
+            ('invoice_date', '>=', date_from),
+            ('invoice_date', '<=', date_to),
+        ]
+
+        created = 0
+        last_id = 0
+        while True:
+            moves = self.search(domain + [('id', '>', last_id)], order='id', limit=batch_size)
+            if not moves:
+                break
+            last_id = moves[-1].id
+
+            created += len(moves.create_radian_default_events())
+            if auto_commit:
+                self.env.cr.commit()
+            self.invalidate_model()
+
+        _logger.debug("Default RADIAN events created from %s to %s: %s", date_from, date_to, created)
+        return created
+
+    def _get_nimbus_type_document_code(self):
+        self.ensure_one()
+        if self.move_type == 'in_invoice':
+            if (('debit_origin_id' in self) and self.debit_origin_id) or self.ei_is_correction_without_reference:
+                # Supplier Debit Note
+                return '192'
+            elif self.is_out_country:
+                # Supplier Export Invoice
+                return '102'
+            else:
+                # Supplier Invoice
+                return '101'
+        elif self.move_type == 'in_refund':
+            # Supplier Credit Note
+            return '191'
+        return False
 
-                # Acknowledgment of receipt of the Electronic Bill of Sale
-                search_rec = search_env.search([('move_id', '=', rec.id), ('event_id', '=', 3)])
-                if not search_rec:
-                    search_env.create({
-                        'move_id': rec.id,
-                        'event_id': 3,
-                        'type': event_type,
-                    })
+    def _is_nimbus_candidate(self):
+        self.ensure_one()
+        return bool(self.company_id.ei_enable and self.company_id.nimbus_api_key and self.number_formatted
+                    and self.should_send_document_to_dian() and self._get_nimbus_type_document_code())
 
-                # Receipt of the good and/or provision of the service
-                search_rec = search_env.search([('move_id', '=', rec.id), ('event_id', '=', 5)])
-                if not search_rec:
-                    search_env.create({
-                        'move_id': rec.id,
-                        'event_id': 5,
-                        'type': event_type,
-                    })
+    def _prepare_nimbus_request(self, api_url):
+        self.ensure_one()
+        return {
+            'url': "{}/edi/{}/{}/{}".format(
+                api_url,
+                self.partner_id.edi_sanitize_vat,
+                self._get_nimbus_type_document_code(),
+                self.ref
+            ),
+            'headers': {
+                "accept": "application/json",
+                "Content-Type": "application/json",
+                "Authorization": "Bearer " + self.company_id.nimbus_api_key
+            },
+        }
 
-                # Express acceptance
-                search_rec = search_env.search([('move_id', '=', rec.id), ('event_id', '=', 6)])
-                if not search_rec:
-                    search_env.create({
-                        'move_id': rec.id,
-                        'event_id': 6,
-                        'type': event_type,
-                    })
+    def _sync_nimbus_uuids(self, max_workers=None, rate_limit=None):
+        """Get the UUIDs of the moves from Nimbus and write the ones found with a single UPDATE.
+
+        The requests run in a bounded thread pool, spaced by the 'jorels.nimbus.rate_limit' requests per second.
+        Nothing is posted in the chatter, the counters are returned instead.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        if max_workers is None:
+            max_workers = int(ICP.get_param('jorels.nimbus.max_workers', '4'))
+        if rate_limit is None:
+            rate_limit = float(ICP.get_param('jorels.nimbus.rate_limit', '10'))
+        api_url = ICP.get_param('jorels.nimbus.api_url', 'https://nimbus.jorels.com')
+
+        candidates = self.filtered(lambda rec: rec._is_nimbus_candidate())
+        stats = {'checked': 0, 'found': 0, 'missing': 0, 'failed': 0, 'skipped': len(self) - len(candidates)}
+        if not candidates:
+            return stats
+
+        jobs = [(rec, rec._prepare_nimbus_request(api_url)) for rec in candidates]
+        limiter = RateLimiter(rate_limit)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+            responses = list(executor.map(lambda job: _fetch_nimbus(job[1], limiter), jobs))
+
+        found = []
+        for (rec, request), response in zip(jobs, responses):
+            stats['checked'] += 1
+            if not isinstance(response, dict) or 'detail' in response or 'is_valid' not in response:
+                stats['failed'] += 1
+                _logger.debug("Nimbus UUID synchronization: %s: %s", rec.name, response)
+            elif response['is_valid'] and response.get('uuid'):
+                found.append((rec.id, response['uuid']))
+            else:
+                stats['missing'] += 1
+
+        if found:
+            self.flush_model(['ei_uuid', 'ei_is_valid'])
+            self._cr.execute("""
+                UPDATE account_move AS m
+                SET ei_uuid = v.uuid, ei_is_valid = TRUE, write_uid = %s, write_date = now() at time zone 'UTC'
+                FROM (VALUES {values}) AS v(id, uuid)
+                WHERE m.id = v.id
+            """.format(values=', '.join(['(%s, %s)'] * len(found))),
+                             [self.env.uid] + [value for row in found for value in row])
+            self.invalidate_model(['ei_uuid', 'ei_is_valid', 'write_uid', 'write_date'])
+            stats['found'] = len(found)
+
+        return stats
 
     def get_uuid_from_nimbus(self):
-        for rec in self:
-            if not rec.company_id.ei_enable:
-                continue
-
-            try:
-                if rec.should_send_document_to_dian() and rec.move_type in ('in_invoice', 'in_refund'):
-                    if rec.move_type == 'in_invoice':
-                        if ((('debit_origin_id' in rec) and rec.debit_origin_id)
-                                or rec.ei_is_correction_without_reference):
-                            # Supplier Debit Note
-                            nimbus_type_document_code = '192'
-                        elif rec.is_out_country:
-                            # Supplier Export Invoice
-                            nimbus_type_document_code = '102'
-                        else:
-                            # Supplier Invoice
-                            nimbus_type_document_code = '101'
-                    elif rec.move_type == 'in_refund':
-                        # Supplier Credit Note
-                        nimbus_type_document_code = '191'
-                    else:
-                        _logger.debug(_("This type of document does not is a Nimbus compatible document"))
-                        continue
-
-                    if rec.number_formatted:
-                        if rec.company_id.nimbus_api_key:
-                            token = rec.company_id.nimbus_api_key
-                        else:
-                            raise UserError(_("You must configure a Nimbus token"))
-
-                        api_url = self.env['ir.config_parameter'].sudo().get_param('jorels.nimbus.api_url',
-                                                                                   'https://nimbus.jorels.com')
+        start = time.perf_counter()
+        stats = self._sync_nimbus_uuids()
+        message = _("Nimbus UUIDs: %(found)s found, %(missing)s not found, %(failed)s failed and %(skipped)s "
+                    "skipped documents") % stats
+        _logger.info("%s in %.2f s", message, time.perf_counter() - start)
 
-                        header = {
-                            "accept": "application/json",
-                            "Content-Type": "application/json",
-                            "Authorization": "Bearer " + token
-                        }
-
-                        api_url = "{}/edi/{}/{}/{}".format(
-                            api_url,
-                            rec.partner_id.edi_sanitize_vat,
-                            nimbus_type_document_code,
-                            rec.ref
-                        )
-
-                        _logger.debug('API URL: %s', api_url)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Get Edi UUID from Nimbus"),
+                'message': message,
+                'sticky': False,
+            }
+        }
 
-                        response = requests.get(api_url, headers=header).json()
-                        _logger.debug('Nimbus API Response: %s', response)
+    @api.model
+    def _search_nimbus_pending(self, date_from, last_id, limit):
+        # Same predicate as the partial index account_move_nimbus_pending_idx
+        self._cr.execute("""
+            SELECT id FROM account_move
+            WHERE move_type IN ('in_invoice', 'in_refund') AND ei_uuid IS NULL AND ref IS NOT NULL
+                AND state != 'cancel' AND date >= %s AND id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (date_from, last_id, limit))
+        return self.browse([row[0] for row in self._cr.fetchall()])
 
-                        if 'detail' in response:
-                            raise UserError(response['detail'])
-                        elif 'is_valid' in response:
-                            if response['is_valid']:
-                                rec.ei_is_valid = response['is_valid']
-                                rec.ei_uuid = response['uuid']
-                                # rec.ei_issue_date = response['date_issue']
-                                # rec.ei_issue_datetime = response['date_issue']
-                                # TODO: Quedan campos pendientes de agregar
-                            else:
-                                rec.message_post(body=_("There is no associated document in Nimbus"))
-                                _logger.debug(_('There is no associated document in Nimbus'))
-                        else:
-                            rec.message_post(body=_("No logical response was obtained from the Nimbus API"))
-                            _logger.debug(_("No logical response was obtained from the Nimbus API"))
-                    else:
-                        rec.message_post(body=_("A Edi number is required to check the document in Nimbus"))
-                        _logger.debug(_("A Edi number is required to check the document in Nimbus"))
-                else:
-                    rec.message_post(body=_("This type of document does not is a Nimbus compatible document"))
-                    _logger.debug(_("This type of document does not is a Nimbus compatible document"))
-            except Exception as e:
-                rec.message_post(body=_("Failed to process the Nimbus request: %s: %s") % (rec.name, e))
-                _logger.debug("Failed to process the Nimbus request: %s", e)
+    @api.model
+    def _cron_sync_nimbus_uuids(self, date_from=None, batch_size=None, auto_commit=True):
+        """Get from Nimbus the UUIDs of the supplier documents still without one, in batches.
+
+        By default the documents of the last 'jorels.nimbus.sync_days' days (31) are consulted.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        if date_from is None:
+            days = int(ICP.get_param('jorels.nimbus.sync_days', '31'))
+            date_from = fields.Date.subtract(fields.Date.context_today(self), days=days)
+        if batch_size is None:
+            batch_size = int(ICP.get_param('jorels.nimbus.batch_size', '200'))
+
+        start = time.perf_counter()
+        totals = {'checked': 0, 'found': 0, 'missing': 0, 'failed': 0, 'skipped': 0}
+        last_id = 0
+        while True:
+            moves = self._search_nimbus_pending(date_from, last_id, batch_size)
+            if not moves:
+                break
+            last_id = moves[-1].id
+
+            for key, value in moves._sync_nimbus_uuids().items():
+                totals[key] += value
+            if auto_commit:
+                self.env.cr.commit()
+            self.invalidate_model()
+
+        totals['duration'] = time.perf_counter() - start
+        _logger.info("Nimbus UUID synchronization since %s: %s checked, %s found, %s not found, %s failed, "
+                     "%s skipped in %.2f s", date_from, totals['checked'], totals['found'], totals['missing'],
+                     totals['failed'], totals['skipped'], totals['duration'])
+        return totals
@@ -33,3 +33,7 @@ class AccountJournal(models.Model):
     resolution_debit_note_id = fields.Many2one('l10n_co_edi_jorels.resolution', string="Debit note resolution",
                                                   ondelete='RESTRICT')
     is_out_country = fields.Boolean(string='Is it for out of the country?', default=False)
+    # Computed and stored by l10n_co_edi_jorels_pos, it avoids searching the POS configurations for every posted
+    # invoice. Without it the flag is not maintained and the POS configurations are searched instead.
+    is_pos_journal = fields.Boolean(string='Is it a POS invoice journal?', default=False, readonly=True, copy=False,
+                                    index=True)
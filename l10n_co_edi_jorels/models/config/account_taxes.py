@@ -20,7 +20,7 @@
 # email: info@jorels.com
 #
 
-from odoo import fields, models
+from odoo import api, fields, models
 
 
 class AccountTax(models.Model):
@@ -32,3 +32,34 @@ class AccountTax(models.Model):
         ('auto', 'Auto'),
         ('no_report', 'Not reporting the taxable base to the DIAN')
     ], string="Taxable base (DIAN)", default='auto', copy=True)
+
+    # Classification used by the amounts and the DIAN payload, computed once instead of matching names on every line
+    edi_tax_class = fields.Selection([
+        ('reported', 'Reported tax'),
+        ('not_reported', 'Tax without reported taxable base'),
+        ('excluded', 'Excluded'),
+        ('withholding', 'Withholding'),
+    ], string="Tax class (DIAN)", compute="_compute_edi_tax_class", store=True, index=True)
+
+    @api.depends('name', 'edi_tax_id', 'edi_tax_id.name', 'dian_report_tax_base')
+    def _compute_edi_tax_class(self):
+        for rec in self:
+            tax_name = rec.name or ''
+            dian_report_tax_base = rec.dian_report_tax_base or 'auto'
+
+            if rec.edi_tax_id:
+                edi_tax_name = rec.edi_tax_id.name or ''
+                is_iva = edi_tax_name == 'IVA'
+                is_withholding = edi_tax_name[:4] == 'Rete'
+            else:
+                is_iva = tax_name.startswith('IVA')
+                is_withholding = tax_name[:3] == 'Rte'
+
+            if tax_name.startswith(('IVA Excluido', 'IVA Compra Excluido')):
+                rec.edi_tax_class = 'excluded'
+            elif is_iva and dian_report_tax_base == 'no_report':
+                rec.edi_tax_class = 'not_reported'
+            elif is_withholding:
+                rec.edi_tax_class = 'withholding'
+            else:
+                rec.edi_tax_class = 'reported'
@@ -23,10 +23,11 @@
 import json
 import logging
 
-import requests
 from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError
 
+from ...tools.http_client import http_client
+
 _logger = logging.getLogger(__name__)
 
 
@@ -80,6 +81,9 @@ class ResCompany(models.Model):
                                            default=True)
     enable_mass_send_print = fields.Boolean(string="Automatic invoice email when validating (In production)",
                                             default=False)
+    ei_async_validation = fields.Boolean(string="Validate electronic documents in background",
+                                         default=False,
+                                         help="Post invoices instantly and queue their DIAN validation.")
 
     # Report
     report_custom_text = fields.Html(string="Header text")
@@ -97,6 +101,9 @@ class ResCompany(models.Model):
     # Nimbus api key
     nimbus_api_key = fields.Char(string="Nimbus api key")
 
+    # Bearer token of the supplier invoices webhook, not the Edipo api key
+    ei_webhook_secret = fields.Char(string="Webhook secret", copy=False, groups='base.group_system')
+
     def _compute_vat_formatted(self):
         for rec in self:
             type_document_identification_id = self.get_type_document_identification_id()
@@ -248,10 +255,10 @@ class ResCompany(models.Model):
                 params = {'token': token}
                 header = {"accept": "application/json", "Content-Type": "application/json"}
                 api_url = api_url + "/environment"
-                response = requests.put(api_url,
-                                        json.dumps(requests_data),
-                                        headers=header,
-                                        params=params).json()
+                response = http_client.put(api_url,
+                                           json.dumps(requests_data),
+                                           headers=header,
+                                           params=params).json()
                 _logger.debug('API Response PUT environment: %s', response)
 
                 if 'detail' in response:
@@ -260,9 +267,9 @@ class ResCompany(models.Model):
                     # rec.env.user.notify_info(message=response['message'])
                     _logger.debug(response['message'])
 
-                response = requests.get(api_url,
-                                        headers=header,
-                                        params=params).json()
+                response = http_client.get(api_url,
+                                           headers=header,
+                                           params=params).json()
                 _logger.debug('API Response GET environment: %s', response)
 
                 if 'type_environment_id' in response:
@@ -23,10 +23,11 @@
 import json
 import logging
 
-import requests
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
 
+from ...tools.http_client import http_client
+
 _logger = logging.getLogger(__name__)
 
 
@@ -50,6 +51,9 @@ class ResConfigSettings(models.TransientModel):
     enable_mass_send_print = fields.Boolean(related="company_id.enable_mass_send_print",
                                             string="Automatic invoice email when validating (In production)",
                                             default=False, readonly=False)
+    ei_async_validation = fields.Boolean(related="company_id.ei_async_validation",
+                                         string="Validate electronic documents in background",
+                                         default=False, readonly=False)
 
     # Report
     report_custom_text = fields.Html(related="company_id.report_custom_text", string="Header text", readonly=False)
@@ -69,6 +73,7 @@ class ResConfigSettings(models.TransientModel):
 
     # Api key
     nimbus_api_key = fields.Char(related="company_id.nimbus_api_key", string="Nimbus api key", readonly=False)
+    ei_webhook_secret = fields.Char(related="company_id.ei_webhook_secret", string="Webhook secret", readonly=False)
 
     # Update resolutions on Odoo database
     @api.model
@@ -88,9 +93,9 @@ class ResConfigSettings(models.TransientModel):
             params = {'token': token}
             header = {"accept": "application/json", "Content-Type": "application/json"}
             api_url = api_url + "/resolutions"
-            response = requests.get(api_url,
-                                    headers=header,
-                                    params=params).json()
+            response = http_client.get(api_url,
+                                       headers=header,
+                                       params=params).json()
             _logger.debug('API Response: %s', response)
 
             if 'detail' in response:
@@ -205,10 +210,10 @@ class ResConfigSettings(models.TransientModel):
                 header = {"accept": "application/json", "Content-Type": "application/json"}
                 api_url = api_url + "/environment"
 
-                response = requests.put(api_url,
-                                        json.dumps(requests_data),
-                                        headers=header,
-                                        params=params).json()
+                response = http_client.put(api_url,
+                                           json.dumps(requests_data),
+                                           headers=header,
+                                           params=params).json()
                 _logger.debug('API Response PUT environment: %s', response)
 
                 if 'detail' in response:
@@ -232,4 +237,5 @@ class ResConfigSettings(models.TransientModel):
         res['ei_enable'] = self.env.company.ei_enable
         res['ei_always_validate'] = self.env.company.ei_always_validate
         res['ei_ignore_edi_email_check'] = self.env.company.ei_ignore_edi_email_check
+        res['ei_async_validation'] = self.env.company.ei_async_validation
         return res
@@ -23,10 +23,11 @@
 import json
 import logging
 
-import requests
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
 
+from ...tools.http_client import http_client
+
 _logger = logging.getLogger(__name__)
 
 
@@ -141,10 +142,10 @@ class Resolution(models.Model):
             params = {'token': token}
             header = {"accept": "application/json", "Content-Type": "application/json"}
             api_url = api_url + "/resolution"
-            response = requests.post(api_url,
-                                     json.dumps(requests_data),
-                                     headers=header,
-                                     params=params).json()
+            response = http_client.post(api_url,
+                                        json.dumps(requests_data),
+                                        headers=header,
+                                        params=params).json()
             _logger.debug('API Response: %s', response)
 
             if 'resolution' in response:
@@ -220,10 +221,10 @@ class Resolution(models.Model):
                 params = {'token': token}
                 header = {"accept": "application/json", "Content-Type": "application/json"}
                 api_url = api_url + "/resolution/" + resolution_id
-                response = requests.put(api_url,
-                                        json.dumps(requests_data),
-                                        headers=header,
-                                        params=params).json()
+                response = http_client.put(api_url,
+                                           json.dumps(requests_data),
+                                           headers=header,
+                                           params=params).json()
                 _logger.debug('API Response: %s', response)
 
                 if 'resolution' in response:
@@ -261,9 +262,9 @@ class Resolution(models.Model):
                 params = {'token': token}
                 header = {"accept": "application/json", "Content-Type": "application/json"}
                 api_url = api_url + "/resolution/" + str(resolution_id)
-                response = requests.delete(api_url,
-                                           headers=header,
-                                           params=params).json()
+                response = http_client.delete(api_url,
+                                              headers=header,
+                                              params=params).json()
                 _logger.debug('API Response: %s', response)
 
                 if 'detail' in response:
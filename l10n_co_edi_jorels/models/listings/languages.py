@@ -22,7 +22,7 @@
 
 import logging
 
-from odoo import fields, models
+from odoo import api, fields, models, tools
 
 _logger = logging.getLogger(__name__)
 
@@ -34,3 +34,27 @@ class Languages(models.Model):
     # "id", "name", "code"
     name = fields.Char(string="Name", required=True, readonly=True)
     code = fields.Char(string="Code", required=False, readonly=True)
+
+    @api.model
+    @tools.ormcache('code')
+    def _get_id_by_code(self, code):
+        """Id of the listing record with this code, False if there is none. Cached for the registry"""
+        return self.search([('code', '=', code)], limit=1, order='id').id
+
+    @api.model
+    @tools.ormcache('record_id')
+    def _get_name_by_id(self, record_id):
+        return self.browse(record_id).exists().name
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.clear_caches()
+        return super(Languages, self).create(vals_list)
+
+    def write(self, vals):
+        self.clear_caches()
+        return super(Languages, self).write(vals)
+
+    def unlink(self):
+        self.clear_caches()
+        return super(Languages, self).unlink()
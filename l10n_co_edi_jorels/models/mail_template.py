@@ -21,16 +21,49 @@
 #
 
 import base64
-import tempfile
-import zipfile
-from pathlib import Path
+import hashlib
 
 from odoo import models, api
 
+from ..tools.zip_bundle import build_zip
+
 
 class MailTemplate(models.Model):
     _inherit = 'mail.template'
 
+    @api.model
+    def _get_attached_zip(self, record, zip_field, checksum_field, attached_document_name, attached_document,
+                          pdf=None):
+        """Base64 zip with the attached document (and the PDF), reusing the stored one when it is still current.
+
+        The checksum covers the name, the attached document and the PDF bytes, so the reused zip always holds the
+        same PDF as the mail. Without a PDF, as with the RADIAN events, the validated documents don't change anymore
+        and the stored zip is reused.
+        """
+        xml_content = base64.b64decode(attached_document)
+        pdf_content = base64.b64decode(pdf) if pdf else b''
+        checksum = hashlib.sha1(b'|'.join([
+            attached_document_name.encode('utf-8'),
+            hashlib.sha1(pdf_content).hexdigest().encode() if pdf else b'',
+            xml_content,
+        ])).hexdigest()
+
+        stored_zip = record.with_context(bin_size=False)[zip_field]
+        if stored_zip and record[checksum_field] == checksum:
+            return stored_zip
+
+        files = []
+        if pdf:
+            files.append((attached_document_name + '.pdf', pdf_content))
+        files.append((attached_document_name + '.xml', xml_content))
+
+        attached_zip = base64.b64encode(build_zip(files))
+        record.write({
+            zip_field: attached_zip,
+            checksum_field: checksum,
+        })
+        return attached_zip
+
     def generate_email(self, res_ids, fields):
         res = super(MailTemplate, self).generate_email(res_ids, fields)
 
@@ -44,9 +77,10 @@ class MailTemplate(models.Model):
         records = self.env[self.model].browse(res_ids)
 
         if self.model == 'account.move':
-            for move in records:
-                inv_default_template = self.env.ref('account.email_template_edi_invoice')
-                ei_template = self.env.ref('l10n_co_edi_jorels.email_template_edi')
+            inv_default_template = self.env.ref('account.email_template_edi_invoice')
+            ei_template = self.env.ref('l10n_co_edi_jorels.email_template_edi')
+            # Each move once, even if it is repeated in a mass send
+            for move in records.browse(dict.fromkeys(records.ids)):
                 if self.id in (ei_template.id, inv_default_template.id):
 
                     if not move.company_id.ei_enable:
@@ -64,36 +98,12 @@ class MailTemplate(models.Model):
                         else:
                             attached_document_name = move.ei_uuid
 
-                        pdf_name = attached_document_name + '.pdf'
-                        pdf_path = Path(tempfile.gettempdir()) / pdf_name
-
-                        xml_name = attached_document_name + '.xml'
-                        xml_path = Path(tempfile.gettempdir()) / xml_name
-
                         zip_name = attached_document_name + '.zip'
-                        zip_path = Path(tempfile.gettempdir()) / zip_name
-
-                        zip_archive = zipfile.ZipFile(zip_path, 'w')
-
-                        pdf_handle = open(pdf_path, 'wb')
-                        pdf_handle.write(base64.decodebytes(res_t['attachments'][0][1]))
-                        pdf_handle.close()
-                        zip_archive.write(pdf_path, arcname=pdf_name)
-
-                        xml_handle = open(xml_path, 'wb')
-                        xml_handle.write(base64.decodebytes(move.ei_attached_document_base64_bytes))
-                        xml_handle.close()
-                        zip_archive.write(xml_path, arcname=xml_name)
-
-                        zip_archive.close()
-
-                        with open(zip_path, 'rb') as f:
-                            attached_zip = f.read()
-                            ei_attached_zip_base64_bytes = base64.encodebytes(attached_zip)
-                            attachments += [(zip_name, ei_attached_zip_base64_bytes)]
-                            move.write({
-                                'ei_attached_zip_base64_bytes': ei_attached_zip_base64_bytes
-                            })
+                        pdf = res_t['attachments'][0][1] if res_t['attachments'] else None
+                        attached_zip = self._get_attached_zip(
+                            move, 'ei_attached_zip_base64_bytes', 'ei_attached_zip_checksum', attached_document_name,
+                            move.with_context(bin_size=False).ei_attached_document_base64_bytes, pdf)
+                        attachments += [(zip_name, attached_zip)]
 
                         res_t["attachments"] = attachments
 
@@ -120,36 +130,11 @@ class MailTemplate(models.Model):
                     else:
                         attached_document_name = radian.edi_uuid
 
-                    # pdf_name = attached_document_name + '.pdf'
-                    # pdf_path = Path(tempfile.gettempdir()) / pdf_name
-
-                    xml_name = attached_document_name + '.xml'
-                    xml_path = Path(tempfile.gettempdir()) / xml_name
-
                     zip_name = attached_document_name + '.zip'
-                    zip_path = Path(tempfile.gettempdir()) / zip_name
-
-                    zip_archive = zipfile.ZipFile(zip_path, 'w')
-
-                    # pdf_handle = open(pdf_path, 'wb')
-                    # pdf_handle.write(base64.decodebytes(res_t['attachments'][0][1]))
-                    # pdf_handle.close()
-                    # zip_archive.write(pdf_path, arcname=pdf_name)
-
-                    xml_handle = open(xml_path, 'wb')
-                    xml_handle.write(base64.decodebytes(radian.edi_attached_document_base64))
-                    xml_handle.close()
-                    zip_archive.write(xml_path, arcname=xml_name)
-
-                    zip_archive.close()
-
-                    with open(zip_path, 'rb') as f:
-                        attached_zip = f.read()
-                        edi_attached_zip_base64 = base64.encodebytes(attached_zip)
-                        attachments += [(zip_name, edi_attached_zip_base64)]
-                        radian.write({
-                            'edi_attached_zip_base64': edi_attached_zip_base64
-                        })
+                    attached_zip = self._get_attached_zip(
+                        radian, 'edi_attached_zip_base64', 'edi_attached_zip_checksum', attached_document_name,
+                        radian.with_context(bin_size=False).edi_attached_document_base64)
+                    attachments += [(zip_name, attached_zip)]
 
                     res_t["attachments"] = attachments
 
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import logging
+import time
+from contextlib import contextmanager
+
+from odoo import api, fields, models, _
+
+from ..tools.phase_timing import record_phase, is_buffer_due, pop_buffer
+
+_logger = logging.getLogger(__name__)
+
+PHASES = [
+    ('json_request', 'Build request'),
+    ('http', 'HTTP round trip'),
+    ('write_response', 'Write response'),
+    ('status_log', 'Status log'),
+    ('email', 'Email'),
+]
+
+
+class PhaseStat(models.Model):
+    _name = "l10n_co_edi_jorels.phase_stat"
+    _description = "E-invoicing phase timings"
+    _order = "day desc, company_id, document_type, phase"
+
+    day = fields.Date(string="Day", required=True, readonly=True, index=True)
+    company_id = fields.Many2one(comodel_name='res.company', string="Company", readonly=True, index=True,
+                                 ondelete='cascade')
+    document_type = fields.Char(string="Document type", required=True, readonly=True)
+    phase = fields.Selection(selection=PHASES, string="Phase", required=True, readonly=True)
+    count = fields.Integer(string="Documents", readonly=True)
+    duration_total = fields.Float(string="Total duration (s)", digits=(16, 3), readonly=True)
+    duration_max = fields.Float(string="Max duration (s)", digits=(16, 3), readonly=True, group_operator='max')
+    duration_avg = fields.Float(string="Average duration (s)", digits=(16, 3), compute="_compute_averages")
+    queries_total = fields.Integer(string="SQL queries", readonly=True)
+    queries_avg = fields.Float(string="Queries by document", digits=(16, 1), compute="_compute_averages")
+
+    _sql_constraints = [
+        ('phase_stat_uniq', 'unique (day, company_id, document_type, phase)',
+         "There is already a row for this day, company, document type and phase."),
+    ]
+
+    @api.depends('count', 'duration_total', 'queries_total')
+    def _compute_averages(self):
+        for rec in self:
+            rec.duration_avg = rec.duration_total / rec.count if rec.count else 0.0
+            rec.queries_avg = rec.queries_total / rec.count if rec.count else 0.0
+
+    @api.model
+    def _is_enabled(self):
+        return bool(int(self.env['ir.config_parameter'].sudo().get_param('jorels.edipo.phase_timing', 1)))
+
+    @api.model
+    def _record(self, records, phase, duration, queries=0):
+        """Split a phase measured for some documents among their companies and document types"""
+        groups = {}
+        for rec in records:
+            document_type = rec.ei_type_document if 'ei_type_document' in rec else rec._name
+            key = (rec.company_id.id, document_type)
+            groups[key] = groups.get(key, 0) + 1
+
+        total = len(records)
+        dbname = self.env.cr.dbname
+        # A duration measured for several documents is not a per document maximum
+        duration_max = duration if total == 1 else None
+        for (company_id, document_type), count in groups.items():
+            record_phase(dbname, company_id, document_type, phase, duration * count / total,
+                         round(queries * count / total), count, duration_max)
+
+        if is_buffer_due(dbname, 60, 500):
+            self._flush_buffer()
+
+    @contextmanager
+    def _measure(self, records, phase):
+        """Measure the duration and SQL queries of a phase of the e-invoicing pipeline for the documents given.
+
+        The samples are kept in memory by process and written at most once a minute, in their own transaction.
+        """
+        if not records or not self._is_enabled():
+            yield
+            return
+
+        cr = self.env.cr
+        queries = cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(records, phase, time.perf_counter() - start, cr.sql_log_count - queries)
+
+    @api.model
+    def _flush_buffer(self):
+        samples = pop_buffer(self.env.cr.dbname)
+        if not samples:
+            return 0
+
+        rows = [(day, company_id, document_type, phase) + tuple(values)
+                for (day, company_id, document_type, phase), values in samples.items()]
+        try:
+            # Own short transaction: the document transaction may still be long, or be rolled back
+            with self.pool.cursor() as cr:
+                cr.execute("""
+                    INSERT INTO l10n_co_edi_jorels_phase_stat
+                        (day, company_id, document_type, phase, count, duration_total, duration_max, queries_total,
+                         create_uid, create_date, write_uid, write_date)
+                    SELECT v.day::date, v.company_id, v.document_type, v.phase, v.count, v.duration_total,
+                           v.duration_max, v.queries_total, %s, now() at time zone 'UTC', %s, now() at time zone 'UTC'
+                    FROM (VALUES {values}) AS v(day, company_id, document_type, phase, count, duration_total,
+                                                duration_max, queries_total)
+                    ON CONFLICT (day, company_id, document_type, phase) DO UPDATE SET
+                        count = l10n_co_edi_jorels_phase_stat.count + EXCLUDED.count,
+                        duration_total = l10n_co_edi_jorels_phase_stat.duration_total + EXCLUDED.duration_total,
+                        duration_max = GREATEST(l10n_co_edi_jorels_phase_stat.duration_max, EXCLUDED.duration_max),
+                        queries_total = l10n_co_edi_jorels_phase_stat.queries_total + EXCLUDED.queries_total,
+                        write_date = EXCLUDED.write_date
+                """.format(values=', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s)'] * len(rows))),
+                           [self.env.uid, self.env.uid] + [value for row in rows for value in row])
+        except Exception as e:
+            _logger.warning("Unable to write the e-invoicing phase timings: %s", e)
+            return 0
+        return len(rows)
+
+    @api.model
+    def _get_prometheus_metrics(self):
+        """Totals by company, document type and phase in the Prometheus text exposition format"""
+        self._flush_buffer()
+        self.env.cr.execute("""
+            SELECT company_id, document_type, phase, SUM(count), SUM(duration_total), MAX(duration_max),
+                   SUM(queries_total)
+            FROM l10n_co_edi_jorels_phase_stat
+            GROUP BY company_id, document_type, phase
+            ORDER BY company_id, document_type, phase
+        """)
+        rows = self.env.cr.fetchall()
+
+        metrics = [
+            ('jorels_edi_phase_documents_total', 'counter', "Documents that went through the phase", 3),
+            ('jorels_edi_phase_duration_seconds_total', 'counter', "Time spent in the phase", 4),
+            ('jorels_edi_phase_duration_seconds_max', 'gauge', "Slowest document in the phase", 5),
+            ('jorels_edi_phase_queries_total', 'counter', "SQL queries run in the phase", 6),
+        ]
+        lines = []
+        for name, metric_type, description, index in metrics:
+            lines.append("# HELP %s %s" % (name, description))
+            lines.append("# TYPE %s %s" % (name, metric_type))
+            for row in rows:
+                if row[index] is None:
+                    # Phases only measured by batch have no max
+                    continue
+                lines.append('%s{company_id="%s",document_type="%s",phase="%s"} %s' % (
+                    name, row[0] or '', row[1], row[2], row[index] or 0))
+        return "\n".join(lines) + "\n"
+
+    def name_get(self):
+        return [(rec.id, _("%s %s (%s)") % (rec.day, rec.phase, rec.document_type)) for rec in self]
@@ -22,11 +22,14 @@
 
 import json
 import logging
+import time
 
-import requests
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
 
+from ..tools.http_client import http_client, CircuitOpenError
+from ..tools.payload_storage import compress_payload, decompress_payload, migrate_inline_payloads
+
 _logger = logging.getLogger(__name__)
 
 
@@ -102,11 +105,15 @@ class Radian(models.Model):
                                            string="Type environment", copy=False, readonly=True,
                                            states={'draft': [('readonly', False)]},
                                            default=lambda self: self._default_edi_type_environment())
-    edi_payload = fields.Text("Payload", copy=False, readonly=True)
+    # Stored gzip-compressed in the filestore, only loaded when opened
+    edi_payload = fields.Text("Payload", copy=False, readonly=True, compute='_compute_edi_payload',
+                              inverse='_inverse_edi_payload')
+    edi_payload_file = fields.Binary("Payload file", attachment=True, copy=False, readonly=True)
 
     # For mail attached
     edi_attached_zip_base64 = fields.Binary('Attached zip', attachment=True, copy=False, readonly=True,
                                             states={'draft': [('readonly', False)]})
+    edi_attached_zip_checksum = fields.Char('Attached zip checksum', copy=False, readonly=True)
 
     user_id = fields.Many2one('res.users', string='Salesperson', tracking=True,
                               readonly=True, states={'draft': [('readonly', False)]},
@@ -184,6 +191,20 @@ class Radian(models.Model):
             else:
                 rec.name = _("New")
 
+    @api.depends('edi_payload_file')
+    def _compute_edi_payload(self):
+        for rec in self:
+            rec.edi_payload = decompress_payload(rec.with_context(bin_size=False).edi_payload_file)
+
+    def _inverse_edi_payload(self):
+        for rec in self:
+            rec.edi_payload_file = compress_payload(rec.edi_payload)
+
+    @api.model
+    def _migrate_edi_payloads(self, batch_size=500, auto_commit=True):
+        """Move the payloads of the old inline column to compressed attachments"""
+        return migrate_inline_payloads(self, 'edi_payload', 'edi_payload_file', batch_size, auto_commit)
+
     def write_response(self, response, payload):
         for rec in self:
             rec.edi_is_valid = response['is_valid']
@@ -212,7 +233,9 @@ class Radian(models.Model):
             rec.edi_pdf_base64 = response['pdf_base64_bytes']
             rec.edi_zip_base64 = response['zip_base64_bytes']
             rec.edi_type_environment = response['type_environment_id']
-            rec.edi_payload = payload
+            # Only rewrite the payload attachment when it changes, the status consultations keep it
+            if rec.edi_payload != payload:
+                rec.edi_payload = payload
 
     def action_post(self):
         for rec in self:
@@ -376,14 +399,22 @@ class Radian(models.Model):
                 if not rec.edi_is_not_test:
                     num_attemps = 1
 
+                response = {}
                 for i in range(num_attemps):
+                    if i:
+                        time.sleep(http_client.backoff(i))
                     try:
-                        response = requests.post(api_url,
-                                                 json.dumps(requests_data),
-                                                 headers=header,
-                                                 params=params).json()
+                        response = http_client.post(api_url,
+                                                    json.dumps(requests_data),
+                                                    headers=header,
+                                                    params=params,
+                                                    retries=0).json()
+                    except CircuitOpenError as e:
+                        _logger.warning("Invalid response: %s", e)
+                        break
                     except Exception as e:
                         _logger.warning("Invalid response: %s", e)
+                        continue
 
                     _logger.debug('API Response: %s', response)
 
@@ -465,10 +496,11 @@ class Radian(models.Model):
 
                     _logger.debug('API URL: %s', api_url)
 
-                    response = requests.post(api_url,
-                                             json.dumps(requests_data),
-                                             headers=header,
-                                             params=params).json()
+                    response = http_client.post(api_url,
+                                                json.dumps(requests_data),
+                                                headers=header,
+                                                params=params,
+                                                idempotent=True).json()
                     _logger.debug('API Response: %s', response)
 
                     if 'detail' in response:
@@ -508,6 +540,30 @@ class Radian(models.Model):
                 _logger.debug("Failed to process the request: %s", e)
                 raise UserError(_("Failed to process the request: %s") % e)
 
+    def init(self):
+        super(Radian, self).init()
+        self.env['l10n_co_edi_jorels.status_sweep']._create_pending_index(self, 'edi_is_valid', 'edi_zip_key',
+                                                                          'edi_uuid')
+
+    @api.model
+    def _get_dian_status_fields(self):
+        return 'edi_is_valid', 'edi_zip_key', 'edi_uuid'
+
+    @api.model
+    def _get_dian_status_pending_domain(self):
+        return [('company_id.ei_enable', '=', True)]
+
+    def _prepare_dian_status_request(self):
+        self.ensure_one()
+        if not self.company_id.api_key:
+            return False
+        return self.env['l10n_co_edi_jorels.status_sweep']._prepare_status_request(
+            self.company_id.api_key, self.edi_type_environment.id, self.edi_zip_key, self.edi_uuid)
+
+    def _apply_dian_status_response(self, response):
+        self.ensure_one()
+        self.write_response(response, self.edi_payload)
+
     def button_open_form_current(self):
         view = self.env.ref('l10n_co_edi_jorels.view_l10n_co_edi_jorels_radian_form')
         context = self.env.context
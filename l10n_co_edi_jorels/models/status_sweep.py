@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo import api, fields, models, _
+
+from ..tools.http_client import http_client
+
+_logger = logging.getLogger(__name__)
+
+
+def _fetch_status(request):
+    # Only HTTP, no ORM: it runs in the worker threads
+    try:
+        return http_client.post(request['url'], json.dumps({}), headers=request['headers'],
+                                params=request['params'], idempotent=True).json()
+    except Exception as e:
+        _logger.warning("DIAN status reconciliation: invalid response: %s", e)
+        return None
+
+
+class StatusSweep(models.Model):
+    _name = "l10n_co_edi_jorels.status_sweep"
+    _description = "DIAN status reconciliation sweep"
+    _order = "id desc"
+
+    model_name = fields.Char(string="Model", required=True, readonly=True, index=True)
+    date_start = fields.Datetime(string="Started on", readonly=True)
+    duration = fields.Float(string="Duration (s)", digits=(16, 3), readonly=True)
+    checked = fields.Integer(string="Checked", readonly=True)
+    resolved = fields.Integer(string="Resolved", readonly=True)
+    failed = fields.Integer(string="Failed requests", readonly=True)
+
+    @api.model
+    def _create_pending_index(self, model, is_valid_field, zip_key_field, uuid_field):
+        """Partial index over the documents sent but not yet valid, so the sweeps don't scan the whole table"""
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS {table}_dian_status_pending_idx ON {table} (id)
+            WHERE {is_valid} IS NOT TRUE AND ({zip_key} IS NOT NULL OR {uuid} IS NOT NULL)
+        """.format(table=model._table, is_valid=is_valid_field, zip_key=zip_key_field, uuid=uuid_field))
+
+    @api.model
+    def _search_pending(self, model, last_id, limit, max_attempts):
+        is_valid_field, zip_key_field, uuid_field = model._get_dian_status_fields()
+        # Same predicate as the partial index, without the documents waiting for their next check or given up
+        self._cr.execute("""
+            SELECT t.id FROM {table} t
+            WHERE t.{is_valid} IS NOT TRUE AND (t.{zip_key} IS NOT NULL OR t.{uuid} IS NOT NULL) AND t.id > %s
+            AND NOT EXISTS (
+                SELECT 1 FROM l10n_co_edi_jorels_status_check c
+                WHERE c.model_name = %s AND c.res_id = t.id
+                AND (c.attempts >= %s OR c.next_check > NOW() AT TIME ZONE 'UTC')
+            )
+            ORDER BY t.id
+            LIMIT %s
+        """.format(table=model._table, is_valid=is_valid_field, zip_key=zip_key_field, uuid=uuid_field),
+                         (last_id, model._name, max_attempts, limit))
+        return model.browse([row[0] for row in self._cr.fetchall()])
+
+    @api.model
+    def _prepare_status_request(self, token, environment, zip_key, uuid):
+        api_url = self.env['ir.config_parameter'].sudo().get_param('jorels.edipo.api_url',
+                                                                   'https://edipo.jorels.com')
+        if zip_key:
+            api_url = api_url + "/zip/" + zip_key
+        else:
+            api_url = api_url + "/document/" + uuid
+
+        return {
+            'url': api_url,
+            'params': {
+                'token': token,
+                'environment': environment
+            },
+            'headers': {"accept": "application/json", "Content-Type": "application/json"},
+        }
+
+    @api.model
+    def _run(self, model_name, batch_size=None, max_workers=None, auto_commit=True):
+        """Poll the DIAN status of the pending documents of a model.
+
+        The models provide _get_dian_status_fields, _get_dian_status_pending_domain, _prepare_dian_status_request
+        and _apply_dian_status_response. The payloads are not rebuilt: only the zip key or UUID is consulted.
+        The documents still not valid are checked again with an exponential backoff, and no more after
+        'jorels.edipo.reconcile_max_attempts' consultations, so the rejected ones are not polled forever.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        if batch_size is None:
+            batch_size = int(ICP.get_param('jorels.edipo.reconcile_batch_size', '100'))
+        if max_workers is None:
+            max_workers = int(ICP.get_param('jorels.edipo.max_workers', '4'))
+        max_attempts = int(ICP.get_param('jorels.edipo.reconcile_max_attempts', '8'))
+        check_env = self.env['l10n_co_edi_jorels.status_check']
+
+        model = self.env[model_name]
+        pending_domain = model._get_dian_status_pending_domain()
+
+        date_start = fields.Datetime.now()
+        start = time.perf_counter()
+        checked = resolved = failed = 0
+        last_id = 0
+        while True:
+            candidates = self._search_pending(model, last_id, batch_size, max_attempts)
+            if not candidates:
+                break
+            last_id = candidates[-1].id
+
+            jobs = []
+            for rec in candidates.filtered_domain(pending_domain):
+                request = rec._prepare_dian_status_request()
+                if request:
+                    jobs.append((rec, request))
+            if not jobs:
+                continue
+
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+                responses = list(executor.map(_fetch_status, [request for rec, request in jobs]))
+
+            unresolved_ids = []
+            for (rec, request), response in zip(jobs, responses):
+                checked += 1
+                if not response or 'is_valid' not in response:
+                    failed += 1
+                    unresolved_ids.append(rec.id)
+                    continue
+                rec._apply_dian_status_response(response)
+                if response['is_valid']:
+                    resolved += 1
+                else:
+                    unresolved_ids.append(rec.id)
+            check_env._register_attempts(model_name, unresolved_ids)
+
+            # All the results of the batch are written together
+            model.flush_model()
+            if auto_commit:
+                self.env.cr.commit()
+            model.invalidate_model()
+
+        sweep = self.create({
+            'model_name': model_name,
+            'date_start': date_start,
+            'duration': time.perf_counter() - start,
+            'checked': checked,
+            'resolved': resolved,
+            'failed': failed,
+        })
+        _logger.info("DIAN status reconciliation of %s: %s checked, %s resolved, %s failed in %.2f s",
+                     model_name, checked, resolved, failed, sweep.duration)
+        return sweep
+
+    def name_get(self):
+        return [(rec.id, _("%s (%s)") % (rec.model_name, rec.date_start)) for rec in self]
+
+
+class StatusCheck(models.Model):
+    _name = "l10n_co_edi_jorels.status_check"
+    _description = "DIAN status consultations of a document still not valid"
+    _order = "next_check"
+
+    model_name = fields.Char(string="Model", required=True, readonly=True)
+    res_id = fields.Many2oneReference(string="Document", model_field='model_name', required=True, readonly=True)
+    attempts = fields.Integer(string="Attempts", readonly=True)
+    next_check = fields.Datetime(string="Next check", readonly=True)
+
+    _sql_constraints = [
+        ('document_uniq', 'unique(model_name, res_id)', "There is already a status check for this document"),
+    ]
+
+    @api.model
+    def _register_attempts(self, model_name, res_ids):
+        """Count a consultation of the documents and delay the next one, 1 hour doubled on every attempt"""
+        if not res_ids:
+            return
+        self._cr.execute("""
+            INSERT INTO l10n_co_edi_jorels_status_check AS c
+                (model_name, res_id, attempts, next_check, create_uid, create_date, write_uid, write_date)
+            SELECT %(model_name)s, res_id, 1, NOW() AT TIME ZONE 'UTC' + INTERVAL '1 hour',
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+            FROM unnest(%(res_ids)s) AS res_id
+            ON CONFLICT (model_name, res_id) DO UPDATE SET
+                attempts = c.attempts + 1,
+                next_check = NOW() AT TIME ZONE 'UTC' +
+                             LEAST(INTERVAL '1 hour' * POWER(2, c.attempts), INTERVAL '7 days'),
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+        """, {'model_name': model_name, 'res_ids': list(res_ids), 'uid': self.env.uid})
+        self.invalidate_model()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import logging
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class SubmissionQueue(models.Model):
+    _name = "l10n_co_edi_jorels.submission_queue"
+    _description = "DIAN submission queue"
+    _order = "id"
+
+    move_id = fields.Many2one(comodel_name='account.move', string="Invoice", required=True, readonly=True,
+                              index=True, ondelete='cascade')
+    company_id = fields.Many2one(related='move_id.company_id', string="Company", store=True, readonly=True)
+    state = fields.Selection(selection=[
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string="Status", required=True, readonly=True, default='queued', index=True, copy=False)
+    is_test = fields.Boolean(string="Test submission", readonly=True, default=False)
+    attempts = fields.Integer(string="Attempts", readonly=True, default=0, copy=False)
+    error_message = fields.Text(string="Error message", readonly=True, copy=False)
+    date_done = fields.Datetime(string="Processed on", readonly=True, copy=False)
+
+    @api.model
+    def enqueue(self, moves, is_test=False):
+        """Queue the electronic validation of the given moves, skipping the ones already pending."""
+        if not moves:
+            return self
+
+        pending = self.search([('move_id', 'in', moves.ids), ('state', 'in', ('queued', 'sending'))])
+        pending_move_ids = set(pending.mapped('move_id').ids)
+        queue_recs = self.create([{
+            'move_id': move.id,
+            'is_test': is_test,
+        } for move in moves if move.id not in pending_move_ids])
+
+        # Wake the dispatcher up instead of waiting for the next scheduled run
+        cron = self.env.ref('l10n_co_edi_jorels.ir_cron_process_submission_queue', False)
+        if cron and queue_recs:
+            cron._trigger()
+
+        return queue_recs
+
+    def _lock_queued(self, batch_size):
+        # Concurrent workers skip the rows already taken by another dispatcher
+        self._cr.execute("""
+            SELECT id FROM l10n_co_edi_jorels_submission_queue
+            WHERE state = 'queued'
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (batch_size,))
+        return self.browse([row[0] for row in self._cr.fetchall()])
+
+    def _process(self):
+        for rec in self:
+            rec.write({'state': 'sending', 'attempts': rec.attempts + 1})
+            try:
+                with self.env.cr.savepoint():
+                    rec.move_id.validate_dian_generic(rec.is_test)
+
+                # With 'Always validate invoices' the errors are only posted in the chatter
+                move = rec.move_id
+                if move.company_id.ei_enable and not move.ei_is_valid and not (rec.is_test and move.ei_uuid):
+                    raise UserError(move.ei_status_message or move.ei_errors_messages
+                                    or _("The document could not be validated in DIAN."))
+
+                rec.write({
+                    'state': 'done',
+                    'error_message': False,
+                    'date_done': fields.Datetime.now(),
+                })
+            except Exception as e:
+                _logger.debug("Failed to process the queued document: %s: %s", rec.move_id.name, e)
+                rec.write({
+                    'state': 'failed',
+                    'error_message': str(e),
+                    'date_done': fields.Datetime.now(),
+                })
+
+    @api.model
+    def _cron_process_queue(self, batch_size=None, auto_commit=True):
+        if batch_size is None:
+            batch_size = int(self.env['ir.config_parameter'].sudo().get_param('jorels.edipo.queue_batch_size', '50'))
+
+        processed = 0
+        while True:
+            queue_recs = self._lock_queued(batch_size)
+            if not queue_recs:
+                break
+
+            queue_recs._process()
+            processed += len(queue_recs)
+
+            if not auto_commit:
+                break
+            self.env.cr.commit()
+
+        _logger.debug("DIAN submission queue: %s documents processed", processed)
+        return processed
+
+    def action_retry(self):
+        to_retry = self.filtered(lambda rec: rec.state == 'failed')
+        to_retry.write({'state': 'queued', 'error_message': False, 'date_done': False})
+
+        cron = self.env.ref('l10n_co_edi_jorels.ir_cron_process_submission_queue', False)
+        if cron and to_retry:
+            cron._trigger()
+        return True
+
+    def action_process_now(self):
+        self.filtered(lambda rec: rec.state in ('queued', 'failed'))._process()
+        return True
+
+    def name_get(self):
+        return [(rec.id, _("%s (%s)") % (rec.move_id.name, rec.state)) for rec in self]
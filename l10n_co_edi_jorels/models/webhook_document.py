@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import json
+import logging
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class WebhookDocument(models.Model):
+    _name = "l10n_co_edi_jorels.webhook_document"
+    _description = "Incoming supplier documents from the webhook"
+    _order = "id"
+
+    company_id = fields.Many2one('res.company', string="Company", required=True, readonly=True, index=True)
+    idempotency_key = fields.Char(string="Idempotency key", required=True, readonly=True)
+    uuid = fields.Char(string="CUFE", readonly=True, index=True)
+    payload = fields.Text(string="Payload", readonly=True)
+    state = fields.Selection(selection=[
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('duplicate', 'Duplicate'),
+        ('failed', 'Failed'),
+    ], string="Status", required=True, readonly=True, default='pending', index=True, copy=False)
+    move_id = fields.Many2one(comodel_name='account.move', string="Invoice", readonly=True, index=True,
+                              ondelete='set null')
+    error_message = fields.Text(string="Error message", readonly=True, copy=False)
+    date_done = fields.Datetime(string="Processed on", readonly=True, copy=False)
+
+    _sql_constraints = [
+        ('idempotency_key_company_uniq', 'unique (company_id, idempotency_key)',
+         "The idempotency key must be unique per company."),
+    ]
+
+    @api.model
+    def _ingest(self, company, documents):
+        """Store the raw documents pushed to the webhook and return the accepted and duplicate keys.
+
+        Only one INSERT for the whole batch: the documents are acknowledged right away and the invoices are
+        created later by the cron. A key already received is ignored, so the provider can safely retry.
+        """
+        rows = []
+        invalid = []
+        for document in documents:
+            key = isinstance(document, dict) and (document.get('idempotency_key') or document.get('uuid'))
+            if not key:
+                invalid.append(document)
+                continue
+            rows.append((company.id, str(key), document.get('uuid') or None, json.dumps(document)))
+
+        accepted = []
+        if rows:
+            self.flush_model()
+            self._cr.execute("""
+                INSERT INTO l10n_co_edi_jorels_webhook_document
+                    (company_id, idempotency_key, uuid, payload, state, create_uid, create_date, write_uid, write_date)
+                SELECT v.company_id, v.idempotency_key, v.uuid, v.payload, 'pending',
+                       %s, now() at time zone 'UTC', %s, now() at time zone 'UTC'
+                FROM (VALUES {values}) AS v(company_id, idempotency_key, uuid, payload)
+                ON CONFLICT (company_id, idempotency_key) DO NOTHING
+                RETURNING idempotency_key
+            """.format(values=', '.join(['(%s, %s, %s, %s)'] * len(rows))),
+                             [self.env.uid, self.env.uid] + [value for row in rows for value in row])
+            accepted = [row[0] for row in self._cr.fetchall()]
+
+            cron = self.env.ref('l10n_co_edi_jorels.ir_cron_process_webhook_documents', False)
+            if cron and accepted:
+                cron._trigger()
+
+        accepted_keys = set(accepted)
+        return {
+            'accepted': len(accepted),
+            'duplicates': len([row for row in rows if row[1] not in accepted_keys]),
+            'invalid': len(invalid),
+        }
+
+    def _lock_pending(self, batch_size):
+        self._cr.execute("""
+            SELECT id FROM l10n_co_edi_jorels_webhook_document
+            WHERE state = 'pending'
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (batch_size,))
+        return self.browse([row[0] for row in self._cr.fetchall()])
+
+    def _get_partners(self, company, documents):
+        """Suppliers of the documents by identification number, creating the missing ones with one create"""
+        partner_env = self.env['res.partner'].with_company(company)
+        suppliers = {}
+        for document in documents:
+            supplier = document.get('supplier') or {}
+            vat = supplier.get('identification_number') or supplier.get('vat')
+            if vat:
+                suppliers.setdefault(str(vat), supplier)
+
+        partners = {}
+        if suppliers:
+            for partner in partner_env.search([('vat', 'in', list(suppliers)), ('parent_id', '=', False),
+                                               ('company_id', 'in', (False, company.id))]):
+                partners.setdefault(partner.vat, partner)
+
+            missing = [vat for vat in suppliers if vat not in partners]
+            if missing:
+                created = partner_env.create([{
+                    'name': suppliers[vat].get('name') or vat,
+                    'vat': vat,
+                    'email': suppliers[vat].get('email') or False,
+                    'company_type': 'company',
+                } for vat in missing])
+                partners.update(zip(missing, created))
+        return partners
+
+    @api.model
+    def _prepare_move_vals(self, company, document, partner):
+        lines = document.get('lines') or [{
+            'description': document.get('number') or document.get('uuid'),
+            'quantity': 1.0,
+            'price_unit': document.get('total', 0.0),
+        }]
+        vals = {
+            'move_type': 'in_invoice',
+            'company_id': company.id,
+            'partner_id': partner.id,
+            'ref': document.get('number'),
+            'invoice_date': document.get('issue_date') and document['issue_date'][:10] or False,
+            'ei_uuid': document.get('uuid'),
+            'invoice_line_ids': [(0, 0, {
+                'name': line.get('description') or '/',
+                'quantity': float(line.get('quantity', 1.0)),
+                'price_unit': float(line.get('price_unit', 0.0)),
+            }) for line in lines],
+        }
+        currency_code = document.get('currency')
+        if currency_code and currency_code != company.currency_id.name:
+            currency = self.env['res.currency'].search([('name', '=', currency_code)], limit=1)
+            if currency:
+                vals['currency_id'] = currency.id
+        return vals
+
+    def _process(self):
+        """Create the supplier invoices of the staged documents, in bulk and deduplicated by CUFE"""
+        for company in self.mapped('company_id'):
+            docs = self.filtered(lambda rec: rec.company_id == company)
+            parsed = {}
+            for rec in docs:
+                try:
+                    parsed[rec] = json.loads(rec.payload)
+                except ValueError as e:
+                    rec.write({'state': 'failed', 'error_message': str(e), 'date_done': fields.Datetime.now()})
+
+            # The CUFEs already in Odoo, with one search for the batch
+            uuids = {document.get('uuid') for document in parsed.values() if document.get('uuid')}
+            existing = {}
+            if uuids:
+                for move in self.env['account.move'].search([('company_id', '=', company.id),
+                                                             ('move_type', 'in', ('in_invoice', 'in_refund')),
+                                                             ('ei_uuid', 'in', list(uuids))]):
+                    existing.setdefault(move.ei_uuid, move)
+
+            partners = self._get_partners(company, parsed.values())
+
+            to_create = []
+            seen_uuids = set()
+            for rec, document in parsed.items():
+                uuid = document.get('uuid')
+                if uuid and uuid in existing:
+                    rec.write({'state': 'duplicate', 'move_id': existing[uuid].id,
+                               'date_done': fields.Datetime.now()})
+                    continue
+                if uuid and uuid in seen_uuids:
+                    # Repeated in this same batch with another idempotency key
+                    rec.write({'state': 'duplicate', 'date_done': fields.Datetime.now()})
+                    continue
+
+                supplier = document.get('supplier') or {}
+                partner = partners.get(str(supplier.get('identification_number') or supplier.get('vat')))
+                if not partner:
+                    rec.write({'state': 'failed', 'error_message': _("The supplier has no identification number."),
+                               'date_done': fields.Datetime.now()})
+                    continue
+
+                try:
+                    vals = self._prepare_move_vals(company, document, partner)
+                except (ValueError, TypeError, AttributeError) as e:
+                    rec.write({'state': 'failed', 'error_message': str(e), 'date_done': fields.Datetime.now()})
+                    continue
+
+                if uuid:
+                    seen_uuids.add(uuid)
+                to_create.append((rec, vals))
+
+            if not to_create:
+                continue
+
+            try:
+                with self.env.cr.savepoint():
+                    moves = self.env['account.move'].with_company(company).with_context(
+                        default_move_type='in_invoice').create([vals for rec, vals in to_create])
+                for (rec, vals), move in zip(to_create, moves):
+                    rec.write({'state': 'done', 'move_id': move.id, 'error_message': False,
+                               'date_done': fields.Datetime.now()})
+            except Exception as e:
+                _logger.debug("Bulk creation of supplier invoices failed, creating them one by one: %s", e)
+                for rec, vals in to_create:
+                    try:
+                        with self.env.cr.savepoint():
+                            move = self.env['account.move'].with_company(company).with_context(
+                                default_move_type='in_invoice').create(vals)
+                        rec.write({'state': 'done', 'move_id': move.id, 'error_message': False,
+                                   'date_done': fields.Datetime.now()})
+                    except Exception as e:
+                        rec.write({'state': 'failed', 'error_message': str(e), 'date_done': fields.Datetime.now()})
+
+    @api.model
+    def _cron_process_documents(self, batch_size=None, auto_commit=True):
+        if batch_size is None:
+            batch_size = int(self.env['ir.config_parameter'].sudo().get_param('jorels.edipo.webhook_batch_size',
+                                                                              '200'))
+
+        processed = 0
+        while True:
+            docs = self._lock_pending(batch_size)
+            if not docs:
+                break
+
+            docs._process()
+            processed += len(docs)
+
+            if not auto_commit:
+                break
+            self.env.cr.commit()
+
+        _logger.debug("Webhook documents processed: %s", processed)
+        return processed
+
+    def action_retry(self):
+        to_retry = self.filtered(lambda rec: rec.state == 'failed')
+        to_retry.write({'state': 'pending', 'error_message': False, 'date_done': False})
+
+        cron = self.env.ref('l10n_co_edi_jorels.ir_cron_process_webhook_documents', False)
+        if cron and to_retry:
+            cron._trigger()
+        return True
+
+    def action_process_now(self):
+        if self.filtered(lambda rec: rec.state != 'pending'):
+            raise UserError(_("Only pending documents can be processed."))
+        self._process()
+        return True
+
+    def name_get(self):
+        return [(rec.id, _("%s (%s)") % (rec.uuid or rec.idempotency_key, rec.state)) for rec in self]
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+from odoo import fields
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+class EdiTestCommon(AccountTestInvoicingCommon):
+    """A COP company with everything the DIAN payload of an invoice needs: resolution, customer, product and tax"""
+
+    @classmethod
+    def setup_company_data(cls, company_name, chart_template=None, **kwargs):
+        # DIAN only accepts companies in COP
+        cop = cls.env.ref('base.COP')
+        cop.active = True
+        kwargs.setdefault('currency_id', cop.id)
+        return super(EdiTestCommon, cls).setup_company_data(company_name, chart_template=chart_template, **kwargs)
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super(EdiTestCommon, cls).setUpClass(chart_template_ref=chart_template_ref)
+
+        cls.company = cls.company_data['company']
+        cls.company.write({
+            'ei_enable': True,
+            # Posted without being sent, the tests send them
+            'enable_validate_state': True,
+            'ei_async_validation': False,
+            'enable_mass_send_print': False,
+            'api_key': 'test',
+            'test_set_id': 'test-set-id',
+        })
+        cls.resolution = cls.env['l10n_co_edi_jorels.resolution'].create({
+            'resolution_api_sync': False,
+            'resolution_type_document_id': cls.env['l10n_co_edi_jorels.type_documents']._get_id_by_code('01'),
+            'resolution_prefix': 'SETP',
+            'resolution_from': 1,
+            'resolution_to': 1000000,
+            'company_id': cls.company.id,
+        })
+        # The DIAN number is taken from the move name, it must start with the resolution prefix
+        cls.company_data['default_journal_sale'].write({
+            'code': 'SETP',
+            'resolution_invoice_id': cls.resolution.id,
+        })
+
+        cls.partner_a.with_context(no_vat_validation=True).write({
+            'is_company': True,
+            'email_edi': 'customer@example.com',
+            'vat': '8001972684',
+            'country_id': cls.env.ref('base.co').id,
+            'type_document_identification_id': cls.env[
+                'l10n_co_edi_jorels.type_document_identifications']._get_id_by_code('31'),
+            'type_regime_id': cls.env['l10n_co_edi_jorels.type_regimes']._get_id_by_code('48'),
+            'type_liability_id': cls.env['l10n_co_edi_jorels.type_liabilities']._get_id_by_code('O-13'),
+            'municipality_id': cls.env['l10n_co_edi_jorels.municipalities']._get_id_by_code('05001'),
+        })
+
+        cls.product_a.default_code = 'PROD-A'
+        cls.product_a.uom_id.edi_unit_measure_id = cls.env['l10n_co_edi_jorels.unit_measures']._get_id_by_code('94')
+        cls.tax_sale_a.edi_tax_id = cls.env['l10n_co_edi_jorels.taxes']._get_id_by_code('01')
+
+    def _create_invoices(self, count, line_count):
+        moves = self.env['account.move'].create([{
+            'move_type': 'out_invoice',
+            'partner_id': self.partner_a.id,
+            'journal_id': self.company_data['default_journal_sale'].id,
+            'invoice_date': fields.Date.context_today(self.env.user),
+            'invoice_line_ids': [(0, 0, {
+                'product_id': self.product_a.id,
+                'quantity': 1,
+                'price_unit': 1000.0 + i,
+                'tax_ids': [(6, 0, self.tax_sale_a.ids)],
+            }) for i in range(line_count)],
+        } for dummy in range(count)])
+        moves.action_post()
+        self.env.flush_all()
+        self.env.invalidate_all()
+        return moves
+
+    def _count_queries(self, func):
+        self.env.flush_all()
+        start = self.cr.sql_log_count
+        func()
+        self.env.flush_all()
+        return self.cr.sql_log_count - start
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+from datetime import timedelta
+
+from odoo.tests import tagged
+
+from .common import EdiTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestJsonRequestCache(EdiTestCommon):
+    """The payload is cached for the documents whose records weren't written in the current transaction"""
+
+    def _backdate(self, seconds):
+        """Move the records written in this transaction to an earlier one, so their payload can be cached"""
+        self.env.flush_all()
+        now = self.env.cr.now()
+        for model in ('account.move', 'account.move.line', 'product.product', 'product.template', 'uom.uom',
+                      'account.tax', 'l10n_co_edi_jorels.taxes', 'l10n_co_edi_jorels.unit_measures', 'res.partner',
+                      'l10n_co_edi_jorels.resolution', 'res.company', 'account.journal', 'res.currency'):
+            self.env.cr.execute(
+                'UPDATE "%s" SET write_date = %%s WHERE write_date >= %%s' % self.env[model]._table,
+                (now - timedelta(seconds=seconds), now))
+        self.env.invalidate_all()
+
+    def test_cache_hit(self):
+        move = self._create_invoices(1, 2)
+        self.assertIsNone(move._get_json_request_key())
+        move.get_json_request()
+        self._backdate(60)
+        self.assertTrue(move._get_json_request_key())
+
+        stats = move.get_json_request_cache_stats()
+        json_request = move.get_json_request()
+        self.assertEqual(move.get_json_request(), json_request)
+        new_stats = move.get_json_request_cache_stats()
+        self.assertEqual(new_stats['misses'], stats['misses'] + 1)
+        self.assertEqual(new_stats['hits'], stats['hits'] + 1)
+
+    def test_template_change(self):
+        move = self._create_invoices(1, 1)
+        move.get_json_request()
+        self._backdate(120)
+        key = move._get_json_request_key()
+        self.assertTrue(key)
+
+        # Only the template is written, the product variant keeps its write date
+        move.invoice_line_ids.product_id.product_tmpl_id.name = 'Changed product'
+        self.assertIsNone(move._get_json_request_key())
+        self._backdate(60)
+        new_key = move._get_json_request_key()
+        self.assertTrue(new_key)
+        self.assertNotEqual(new_key, key)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import EdiTestCommon
+
+
+def _raise_validation_error(self, error, raise_error=True):
+    # The batch only posts the errors in the chatter, raise them so a failing test shows the cause
+    raise error
+
+
+@tagged('post_install', '-at_install')
+class TestEiQueryCount(EdiTestCommon):
+    """The number of queries to build and send the DIAN requests doesn't grow with the invoices or their lines"""
+
+    def _get_response(self):
+        return {
+            'is_valid': True,
+            'is_restored': False,
+            'algorithm': 'CUFE-SHA384',
+            'class': '',
+            'uuid': 'test-uuid',
+            'issue_date': fields.Datetime.to_string(fields.Datetime.now()),
+            'expedition_date': fields.Datetime.to_string(fields.Datetime.now()),
+            'zip_key': '',
+            'status_code': '00',
+            'status_description': 'Procesado Correctamente.',
+            'status_message': '',
+            'errors_messages': [],
+            'xml_name': 'fv.xml',
+            'zip_name': 'z.zip',
+            'signature': '',
+            'qr_code': '',
+            'qr_data': '',
+            'qr_link': '',
+            'pdf_download_link': '',
+            'xml_base64_bytes': False,
+            'application_response_base64_bytes': False,
+            'attached_document_base64_bytes': False,
+            'pdf_base64_bytes': False,
+            'zip_base64_bytes': False,
+            'type_environment_id': 2,
+        }
+
+    def test_prefetch_ei_data(self):
+        # Warm the ormcaches of the DIAN lookups
+        self._create_invoices(1, 1)._prefetch_ei_data()
+
+        move = self._create_invoices(1, 1)
+        queries = self._count_queries(move._prefetch_ei_data)
+
+        moves = self._create_invoices(5, 3)
+        with self.assertQueryCount(queries):
+            moves._prefetch_ei_data()
+
+    def test_get_json_request(self):
+        move = self._create_invoices(1, 1)
+        self.assertTrue(move.get_json_request(move._prefetch_ei_data())['lines'])
+
+        move = self._create_invoices(1, 1)
+        lookups = move._prefetch_ei_data()
+        queries = self._count_queries(lambda: move.get_json_request(lookups))
+
+        move = self._create_invoices(1, 5)
+        lookups = move._prefetch_ei_data()
+        with self.assertQueryCount(queries):
+            json_request = move.get_json_request(lookups)
+        self.assertEqual(len(json_request['lines']), 5)
+
+    def test_validate_dian_batch(self):
+        move_class = type(self.env['account.move'])
+        with patch.object(move_class, '_send_dian_request', return_value=self._get_response()), \
+                patch.object(move_class, '_dian_validation_failed', _raise_validation_error):
+            self._create_invoices(3, 1).validate_dian_batch(is_test=True)
+
+            moves = self._create_invoices(3, 1)
+            queries = self._count_queries(lambda: moves.validate_dian_batch(is_test=True))
+            self.assertTrue(all(moves.mapped('ei_is_valid')))
+
+            moves = self._create_invoices(3, 4)
+            with self.assertQueryCount(queries):
+                moves.validate_dian_batch(is_test=True)
+            self.assertTrue(all(moves.mapped('ei_is_valid')))
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+from .http_client import http_client, HttpClient, CircuitOpenError, RateLimiter
+from .amount_words import amount_to_words
+from .qr_code import render_qr, render_qr_data_uri
+from .payload_storage import compress_payload, decompress_payload, migrate_inline_payloads
+from .attached_document import parse_attached_document
+from .zip_bundle import build_zip
+from .phase_timing import record_phase, is_buffer_due, pop_buffer
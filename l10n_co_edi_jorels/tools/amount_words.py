@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import math
+from functools import lru_cache
+
+from num2words import num2words
+
+
+@lru_cache(maxsize=2048)
+def amount_to_words(amount, lang, unit_label, subunit_label='', decimal_places=2):
+    """Amount in words in upper case, followed by the currency labels, e.g. 'MIL PESOS, CINCUENTA CENTAVOS.'
+
+    The results are memoized by (amount, lang, currency), so the same totals are converted only once per process.
+    """
+    decimal_part, integer_part = math.modf(abs(amount))
+    if decimal_part:
+        decimal_part = round(decimal_part * math.pow(10, decimal_places))
+
+    value_letters = num2words(integer_part, lang=lang).upper() + ' ' + (unit_label or '').upper()
+    if decimal_part:
+        value_letters = (value_letters + ', ' +
+                         num2words(decimal_part, lang=lang).upper() + ' ' + (subunit_label or '').upper() + '.')
+    return value_letters
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import base64
+import logging
+from io import BytesIO
+
+from lxml import etree
+
+_logger = logging.getLogger(__name__)
+
+
+def _localname(tag):
+    # Comments and processing instructions don't have a string tag
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def _iterparse(raw):
+    """Yield (path, element) at the end of each element, releasing the parsed elements as it goes"""
+    path = []
+    for event, element in etree.iterparse(BytesIO(raw), events=('start', 'end'), resolve_entities=False,
+                                          no_network=True, huge_tree=True):
+        if event == 'start':
+            path.append(_localname(element.tag))
+            continue
+        path.pop()
+        yield path, element
+        element.clear()
+
+
+def parse_attached_document(data):
+    """Key identifiers of a base64 DIAN AttachedDocument, read with a streaming parser.
+
+    Returns a dict with the ParentDocumentID, the CUFE and issue date of the referenced document, and the payable
+    amount of the embedded invoice. The values not found are False.
+    """
+    info = {
+        'parent_document_id': False,
+        'uuid': False,
+        'issue_date': False,
+        'payable_amount': False,
+    }
+    if not data:
+        return info
+
+    try:
+        embedded = None
+        for path, element in _iterparse(base64.b64decode(data)):
+            name = _localname(element.tag)
+            text = (element.text or '').strip()
+            if name == 'ParentDocumentID' and not info['parent_document_id']:
+                info['parent_document_id'] = text
+            elif name == 'UUID' and 'DocumentReference' in path and not info['uuid']:
+                info['uuid'] = text
+            elif name == 'IssueDate' and 'DocumentReference' in path and not info['issue_date']:
+                info['issue_date'] = text
+            elif name == 'Description' and 'ExternalReference' in path \
+                    and 'ParentDocumentLineReference' not in path and embedded is None:
+                # The signed invoice, embedded as CDATA
+                embedded = text
+
+        if embedded and embedded.startswith('<'):
+            for path, element in _iterparse(embedded.encode('utf-8')):
+                name = _localname(element.tag)
+                if name == 'PayableAmount' and 'LegalMonetaryTotal' in path:
+                    info['payable_amount'] = float(element.text or 0.0)
+                    break
+                elif name == 'UUID' and len(path) == 1 and not info['uuid']:
+                    info['uuid'] = (element.text or '').strip()
+                elif name == 'IssueDate' and len(path) == 1 and not info['issue_date']:
+                    info['issue_date'] = (element.text or '').strip()
+    except (etree.XMLSyntaxError, ValueError) as e:
+        _logger.debug("The attached document could not be parsed: %s", e)
+
+    return info
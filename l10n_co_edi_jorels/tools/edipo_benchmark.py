@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+"""Load benchmark of the DIAN submission flows, meant to be run from an Odoo shell:
+
+    from odoo.addons.l10n_co_edi_jorels.tools.edipo_benchmark import run
+    run(env, count=200)
+
+It copies a posted invoice of the current company N times, posts the copies without sending them and then measures
+validate_dian_generic, status_document_log and the RADIAN validate_dian_generic of the default events, document by
+document. By default the requests go to the local stand-in of tools/edipo_stub.py, started in a thread, and
+everything is rolled back at the end.
+"""
+
+import logging
+import time
+
+from odoo import fields
+from odoo.exceptions import UserError
+
+from .edipo_stub import EdipoStubConfig, start_in_thread
+
+_logger = logging.getLogger(__name__)
+
+PRODUCTION_API_URL = 'https://edipo.jorels.com'
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def _measure(env, records, method, *args):
+    """Call the method record by record and return (durations, queries, errors)"""
+    durations = []
+    queries = []
+    errors = 0
+    for rec in records:
+        queries_start = env.cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            getattr(rec, method)(*args)
+            env.flush_all()
+        except Exception as e:
+            errors += 1
+            _logger.debug("Benchmark: %s of %s failed: %s", method, rec.display_name, e)
+        durations.append(time.perf_counter() - start)
+        queries.append(env.cr.sql_log_count - queries_start)
+    return durations, queries, errors
+
+
+def _phase_report(name, durations, queries, errors, wall):
+    count = len(durations)
+    return {
+        'phase': name,
+        'documents': count,
+        'errors': errors,
+        'p50': _percentile(durations, 50),
+        'p95': _percentile(durations, 95),
+        'max': max(durations) if durations else 0.0,
+        'wall': wall,
+        'throughput': count / wall if wall else 0.0,
+        'queries_per_document': sum(queries) / count if count else 0.0,
+    }
+
+
+def _total_report(name, count, queries, errors, wall):
+    """Report of a phase measured as a whole, without per document latencies"""
+    return {
+        'phase': name,
+        'documents': count,
+        'errors': errors,
+        'p50': None,
+        'p95': None,
+        'max': None,
+        'wall': wall,
+        'throughput': count / wall if wall else 0.0,
+        'queries_per_document': queries / count if count else 0.0,
+    }
+
+
+def _format_seconds(value):
+    return "%9s" % '-' if value is None else "%9.3f" % value
+
+
+def format_report(report):
+    lines = ["%-22s %9s %7s %9s %9s %9s %9s %12s %12s" % (
+        'Phase', 'Documents', 'Errors', 'p50 (s)', 'p95 (s)', 'Max (s)', 'Wall (s)', 'Docs/s', 'Queries/doc')]
+    for phase in report:
+        lines.append("%-22s %9d %7d %s %s %s %9.3f %12.2f %12.1f" % (
+            phase['phase'], phase['documents'], phase['errors'], _format_seconds(phase['p50']),
+            _format_seconds(phase['p95']), _format_seconds(phase['max']), phase['wall'], phase['throughput'],
+            phase['queries_per_document']))
+    return "\n".join(lines)
+
+
+def run(env, count=100, template=None, is_test=False, batch=False, stub=True, stub_config=None, radian=True,
+        commit=False, allow_production=False):
+    """Post `count` copies of `template` (by default the last posted invoice of the company) and measure the
+    submission flows. With batch=True, validate_dian_batch is measured as a whole instead of document by document,
+    so that phase only reports totals.
+
+    Returns the report, a list of dicts by phase with p50/p95/max latency and wall time in seconds, throughput and
+    queries per document, and prints it. The API url parameter and the company settings are restored at the end,
+    even with commit=True.
+    """
+    company = env.company
+    if template is None:
+        template = env['account.move'].search([
+            ('company_id', '=', company.id),
+            ('move_type', '=', 'out_invoice'),
+            ('ei_type_document', '=', 'invoice'),
+            ('state', '=', 'posted'),
+        ], order='id desc', limit=1)
+    if not template:
+        raise UserError("There is no posted electronic invoice to use as template in %s" % company.name)
+
+    ICP = env['ir.config_parameter'].sudo()
+    previous_api_url = ICP.get_param('jorels.edipo.api_url')
+    previous_settings = {
+        'enable_validate_state': company.enable_validate_state,
+        'ei_async_validation': company.ei_async_validation,
+    }
+    api_url = previous_api_url or PRODUCTION_API_URL
+    server = None
+    if stub:
+        server = start_in_thread(config=stub_config or EdipoStubConfig())
+        api_url = "http://%s:%s" % server.server_address
+    elif api_url.rstrip('/') == PRODUCTION_API_URL and not allow_production:
+        raise UserError("Set 'jorels.edipo.api_url' to a stand-in API or pass allow_production=True")
+
+    env.flush_all()
+    env.cr.execute("SAVEPOINT edipo_benchmark")
+    try:
+        ICP.set_param('jorels.edipo.api_url', api_url)
+        # Only post the copies, the submissions are measured below
+        company.sudo().write({'enable_validate_state': True, 'ei_async_validation': False})
+
+        today = fields.Date.context_today(template)
+        moves = env['account.move'].browse()
+        for i in range(count):
+            moves |= template.copy({'invoice_date': today, 'ref': "BENCH-%s" % i})
+        moves.action_post()
+        company.sudo().write({'enable_validate_state': False})
+        env.flush_all()
+
+        report = []
+        start = time.perf_counter()
+        if batch:
+            queries_start = env.cr.sql_log_count
+            moves.validate_dian_batch(is_test)
+            env.flush_all()
+            wall = time.perf_counter() - start
+            report.append(_total_report('validate_dian_batch', len(moves), env.cr.sql_log_count - queries_start,
+                                        len(moves.filtered(lambda move: not move.ei_is_valid)), wall))
+        else:
+            durations, queries, errors = _measure(env, moves, 'validate_dian_generic', is_test)
+            report.append(_phase_report('validate_dian_generic', durations, queries, errors,
+                                        time.perf_counter() - start))
+
+        start = time.perf_counter()
+        durations, queries, errors = _measure(env, moves, 'status_document_log')
+        report.append(_phase_report('status_document_log', durations, queries, errors, time.perf_counter() - start))
+
+        if radian:
+            events = moves.create_radian_default_events()
+            start = time.perf_counter()
+            durations, queries, errors = _measure(env, events, 'validate_dian_generic')
+            report.append(_phase_report('radian validate', durations, queries, errors, time.perf_counter() - start))
+
+        if server:
+            with server.RequestHandlerClass.state.lock:
+                stub_stats = dict(server.RequestHandlerClass.state.stats)
+            _logger.info("Edipo stand-in counters: %s", stub_stats)
+    finally:
+        if commit:
+            env.cr.execute("RELEASE SAVEPOINT edipo_benchmark")
+        else:
+            env.cr.execute("ROLLBACK TO SAVEPOINT edipo_benchmark")
+            env.invalidate_all()
+        # With commit, the stand-in url and the benchmark settings would otherwise stay in the database
+        ICP.set_param('jorels.edipo.api_url', previous_api_url)
+        company.sudo().write(previous_settings)
+        env.flush_all()
+        env.registry.clear_caches()
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    print(format_report(report))
+    return report
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+"""Local stand-in for the Edipo API, to measure the e-invoicing flows without reaching DIAN.
+
+It only depends on the standard library and can run apart from Odoo:
+
+    python edipo_stub.py --port 8765 --latency 300 --jitter 100 --error-rate 0.02 --invalid-rate 0.05
+
+Then point the 'jorels.edipo.api_url' system parameter to http://localhost:8765. The documents, zip/document
+status, logs and RADIAN basic events answer with the same keys as the real API, the documents validated are kept in
+memory so the status consultations find them. GET /_stats returns the counters of the server.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DOCUMENT_TYPES = ('invoice', 'credit_note', 'debit_note', 'doc_support', 'note_support', 'basic_event')
+
+
+class EdipoStubConfig(object):
+    def __init__(self, latency=200.0, jitter=50.0, error_rate=0.0, invalid_rate=0.0, auth_failure_rate=0.0,
+                 token=None):
+        # Latency and jitter in milliseconds, rates between 0 and 1
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.invalid_rate = invalid_rate
+        self.auth_failure_rate = auth_failure_rate
+        self.token = token
+
+
+class EdipoStubState(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.documents = {}
+        self.stats = {'requests': 0, 'valid': 0, 'invalid': 0, 'errors': 0, 'unauthenticated': 0}
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+
+def build_document_response(data, type_document, is_valid, is_test):
+    """Response of a document submission, with the keys read by write_response"""
+    body = json.dumps(data, sort_keys=True).encode()
+    cufe = hashlib.sha384(body + str(time.time()).encode()).hexdigest()
+    number = str(data.get('number') or data.get('code') or random.randint(1, 999999))
+    prefix = (data.get('resolution') or {}).get('prefix') or data.get('prefix') or ''
+    now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    xml_name = "fv%s.xml" % number.zfill(10)
+    zip_key = str(uuid.uuid4()) if is_test else None
+    qr_data = "NumFac: %s%s\nCUFE: %s\nQRCode: https://catalogo-vpfe.dian.gov.co/document/searchqr?documentkey=%s" % (
+        prefix, number, cufe, cufe)
+    fake_file = base64.b64encode(b'stub').decode()
+    return {
+        'is_valid': is_valid,
+        'is_restored': False,
+        'algorithm': 'CUFE-SHA384',
+        'class': type_document,
+        'number': prefix + number,
+        'uuid': cufe,
+        'issue_date': now,
+        'expedition_date': now,
+        'zip_key': zip_key,
+        'status_code': '00' if is_valid else '99',
+        'status_description': 'Procesado Correctamente.' if is_valid else 'Validación contiene errores en campos '
+                                                                          'mandatorios.',
+        'status_message': "La %s %s%s, ha sido autorizada." % (type_document, prefix, number) if is_valid else '',
+        'errors_messages': [] if is_valid else ["Regla: FAD06, Rechazo: Valor del CUFE no está calculado "
+                                                "correctamente."],
+        'xml_name': xml_name,
+        'zip_name': xml_name.replace('.xml', '.zip'),
+        'signature': base64.b64encode(hashlib.sha256(body).digest()).decode(),
+        'qr_code': qr_data,
+        'qr_data': qr_data,
+        'qr_link': "https://catalogo-vpfe.dian.gov.co/document/searchqr?documentkey=%s" % cufe,
+        'pdf_download_link': "https://catalogo-vpfe.dian.gov.co/Document/DownloadPDF?trackId=%s" % cufe,
+        'xml_base64_bytes': fake_file,
+        'application_response_base64_bytes': fake_file,
+        'attached_document_base64_bytes': fake_file,
+        'pdf_base64_bytes': fake_file,
+        'zip_base64_bytes': fake_file,
+        'type_environment_id': 2 if is_test else 1,
+    }
+
+
+class EdipoStubHandler(BaseHTTPRequestHandler):
+    config = None
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate(self, params):
+        """Latency, authentication and server failures shared by all the endpoints. True when already answered"""
+        config = self.config
+        delay = max(0.0, random.gauss(config.latency, config.jitter)) if config.jitter else config.latency
+        time.sleep(delay / 1000.0)
+        self.state.count('requests')
+
+        token = (params.get('token') or [None])[0]
+        if not token or (config.token and token != config.token) or random.random() < config.auth_failure_rate:
+            self.state.count('unauthenticated')
+            self._reply(401, {'message': 'Unauthenticated.'})
+            return True
+        if random.random() < config.error_rate:
+            self.state.count('errors')
+            self._reply(random.choice((500, 502, 503)), {'message': 'Server Error'})
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/_stats':
+            with self.state.lock:
+                stats = dict(self.state.stats, documents=len(self.state.documents))
+            return self._reply(200, stats)
+        self.do_POST()
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            data = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._reply(422, {'message': 'The given data was invalid.', 'errors': {'body': ['Invalid JSON']}})
+
+        if self._simulate(params):
+            return
+
+        parts = [part for part in url.path.split('/') if part]
+        if len(parts) == 1 and parts[0] in DOCUMENT_TYPES:
+            is_test = 'test_set_id' in params
+            is_valid = random.random() >= self.config.invalid_rate
+            response = build_document_response(data if isinstance(data, dict) else {}, parts[0], is_valid,
+                                               is_test)
+            with self.state.lock:
+                self.state.documents[response['uuid']] = response
+                if response['zip_key']:
+                    self.state.documents[response['zip_key']] = response
+                self.state.documents[response['number']] = response
+            self.state.count('valid' if is_valid else 'invalid')
+            return self._reply(200, response)
+
+        if len(parts) == 2 and parts[0] in ('zip', 'document'):
+            with self.state.lock:
+                response = self.state.documents.get(parts[1])
+            if response is None:
+                response = build_document_response({'number': parts[1]}, 'invoice', True, parts[0] == 'zip')
+            return self._reply(200, dict(response, is_valid=True, status_code='00'))
+
+        if len(parts) == 2 and parts[0] == 'logs':
+            with self.state.lock:
+                response = self.state.documents.get(parts[1])
+            return self._reply(200, [response] if response else [])
+
+        if parts in (['environment'], ['resolutions'], ['resolution']) or (parts and parts[0] == 'resolution'):
+            return self._reply(200, {'success': True, 'message': 'OK'} if parts[0] == 'environment' else [])
+
+        self._reply(404, {'detail': 'Not Found'})
+
+
+def make_server(host='127.0.0.1', port=0, config=None):
+    """Build the stand-in server, port 0 chooses a free one. Call serve_forever() (or run it in a thread)"""
+    handler = type('EdipoStubHandler', (EdipoStubHandler,), {
+        'config': config or EdipoStubConfig(),
+        'state': EdipoStubState(),
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_in_thread(host='127.0.0.1', port=0, config=None):
+    """Start the server in a daemon thread and return it, server.server_address gives the port taken"""
+    server = make_server(host, port, config)
+    thread = threading.Thread(target=server.serve_forever, name='edipo-stub', daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=200.0, help="Mean response time in ms")
+    parser.add_argument('--jitter', type=float, default=50.0, help="Standard deviation of the response time in ms")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of 5xx responses (0-1)")
+    parser.add_argument('--invalid-rate', type=float, default=0.0, help="Share of documents rejected by DIAN (0-1)")
+    parser.add_argument('--auth-failure-rate', type=float, default=0.0, help="Share of 401 responses (0-1)")
+    parser.add_argument('--token', help="Only accept this token, by default any token is accepted")
+    args = parser.parse_args()
+
+    config = EdipoStubConfig(args.latency, args.jitter, args.error_rate, args.invalid_rate, args.auth_failure_rate,
+                             args.token)
+    server = make_server(args.host, args.port, config)
+    print("Edipo stand-in listening on http://%s:%s" % server.server_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+IDEMPOTENT_METHODS = ('GET', 'PUT', 'DELETE')
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The host has failed too many times in a row, requests are rejected without trying"""
+
+
+class _Circuit(object):
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+
+
+class RateLimiter(object):
+    """Spaces the calls of all the threads sharing it to at most `rate` per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_until = max(self._next_at, now)
+            self._next_at = wait_until + self.interval
+        if wait_until > now:
+            time.sleep(wait_until - now)
+
+
+class HttpClient(object):
+    """Shared HTTP client for the Jorels APIs (Edipo, Nimbus, ...).
+
+    It keeps one pooled keep-alive session per host, applies connect/read timeouts, retries connection errors and
+    overloaded responses with exponential backoff and jitter, and opens a circuit breaker per host after
+    consecutive failures, so the requests fail fast while the API is down.
+    """
+
+    def __init__(self, connect_timeout=10, read_timeout=60, max_retries=2, backoff_factor=0.5, backoff_max=10,
+                 failure_threshold=5, recovery_timeout=30, pool_maxsize=10):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.pool_maxsize = pool_maxsize
+
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._circuits = {}
+        self._stats = {}
+
+    def _get_session(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sessions[host] = session
+            return session
+
+    def _count(self, host, key, value=1):
+        with self._lock:
+            host_stats = self._stats.setdefault(host, {
+                'requests': 0,
+                'retries': 0,
+                'failures': 0,
+                'rejected': 0,
+                'latency_total': 0.0,
+                'latency_max': 0.0,
+            })
+            if key == 'latency':
+                host_stats['latency_total'] += value
+                host_stats['latency_max'] = max(host_stats['latency_max'], value)
+            else:
+                host_stats[key] += value
+
+    def _check_circuit(self, host):
+        with self._lock:
+            circuit = self._circuits.setdefault(host, _Circuit())
+            if circuit.opened_at is None:
+                return
+            if time.monotonic() - circuit.opened_at >= self.recovery_timeout:
+                # Half open: let one request through, a new failure opens the circuit again
+                circuit.opened_at = None
+                circuit.failures = self.failure_threshold - 1
+                return
+        self._count(host, 'rejected')
+        raise CircuitOpenError("The service %s is not available, try again later" % host)
+
+    def _record_result(self, host, success):
+        with self._lock:
+            circuit = self._circuits.setdefault(host, _Circuit())
+            if success:
+                circuit.failures = 0
+                circuit.opened_at = None
+            else:
+                circuit.failures += 1
+                if circuit.failures >= self.failure_threshold and circuit.opened_at is None:
+                    circuit.opened_at = time.monotonic()
+                    _logger.warning("Circuit opened for %s after %s consecutive failures", host, circuit.failures)
+
+    def backoff(self, attempt):
+        """Seconds to wait before the given retry attempt (1, 2, ...), exponential with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** (attempt - 1))))
+
+    def request(self, method, url, retries=None, idempotent=None, **kwargs):
+        """Send a request with retries. Only idempotent requests (GET, PUT, DELETE, or `idempotent=True` for the
+        POST consultations) are sent again after a read timeout or a 429/502/503/504 answer, because the server
+        may have processed the first one; connection errors are always retried."""
+        host = urlparse(url).netloc
+        retries = self.max_retries if retries is None else retries
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault('timeout', self.timeout)
+        session = self._get_session(host)
+
+        attempt = 0
+        while True:
+            self._check_circuit(host)
+            self._count(host, 'requests')
+            start = time.monotonic()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._count(host, 'latency', time.monotonic() - start)
+                self._count(host, 'failures')
+                self._record_result(host, False)
+                # A read timeout may have reached the server, only idempotent requests are sent again
+                retryable = isinstance(e, requests.exceptions.ConnectionError) or idempotent
+                if attempt >= retries or not retryable:
+                    raise
+                _logger.debug("Request to %s failed, retrying: %s", host, e)
+            else:
+                self._count(host, 'latency', time.monotonic() - start)
+                server_error = response.status_code >= 500 or response.status_code == 429
+                self._record_result(host, not server_error)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= retries or not idempotent:
+                    if server_error:
+                        self._count(host, 'failures')
+                    return response
+                _logger.debug("Request to %s answered %s, retrying", host, response.status_code)
+
+            attempt += 1
+            self._count(host, 'retries')
+            time.sleep(self.backoff(attempt))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.request('PUT', url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def get_stats(self):
+        """Counters by host: requests, retries, failures, rejected by the circuit breaker and latency"""
+        with self._lock:
+            stats = {}
+            for host, host_stats in self._stats.items():
+                stats[host] = dict(host_stats)
+                requests_count = host_stats['requests']
+                stats[host]['latency_avg'] = host_stats['latency_total'] / requests_count if requests_count else 0.0
+            return stats
+
+
+http_client = HttpClient()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import base64
+import gzip
+import logging
+
+from odoo.tools.sql import column_exists
+
+_logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def compress_payload(payload):
+    """Gzip the payload text, encoded in base64 to be stored in a binary field"""
+    if not payload:
+        return False
+    return base64.b64encode(gzip.compress(payload.encode('utf-8'), compresslevel=6))
+
+
+def decompress_payload(data):
+    if not data:
+        return False
+    raw = base64.b64decode(data)
+    if raw[:2] == GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    return raw.decode('utf-8')
+
+
+def migrate_inline_payloads(model, column, field_name, batch_size=500, auto_commit=True):
+    """Move the payloads stored in an old text column to the compressed attachment field, in chunks.
+
+    Each chunk only locks its own rows and is committed before the next one, so the table stays usable while the
+    migration runs. Returns the number of migrated rows.
+    """
+    cr = model.env.cr
+    table = model._table
+    if not column_exists(cr, table, column):
+        return 0
+
+    migrated = 0
+    while True:
+        cr.execute("""
+            SELECT id, {column} FROM {table}
+            WHERE {column} IS NOT NULL
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """.format(column=column, table=table), (batch_size,))
+        rows = cr.fetchall()
+        if not rows:
+            break
+
+        ids = tuple(row[0] for row in rows)
+
+        # Records written after the upgrade already have their payload in an attachment
+        cr.execute("""
+            SELECT res_id FROM ir_attachment
+            WHERE res_model = %s AND res_field = %s AND res_id IN %s
+        """, (model._name, field_name, ids))
+        done_ids = {row[0] for row in cr.fetchall()}
+
+        # The attachment of a binary field is found by res_model, res_field and res_id
+        model.env['ir.attachment'].sudo().create([{
+            'name': field_name,
+            'res_model': model._name,
+            'res_field': field_name,
+            'res_id': record_id,
+            'type': 'binary',
+            'datas': compress_payload(payload),
+        } for record_id, payload in rows if payload and record_id not in done_ids])
+
+        cr.execute("UPDATE {table} SET {column} = NULL WHERE id IN %s".format(column=column, table=table), (ids,))
+        migrated += len(rows)
+
+        if not auto_commit:
+            break
+        cr.commit()
+        _logger.debug("Payloads moved to attachments in %s: %s", table, migrated)
+
+    return migrated
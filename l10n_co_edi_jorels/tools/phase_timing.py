@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import threading
+import time
+
+# Samples of the e-invoicing phases by database, aggregated in memory and written from time to time by the phase
+# statistics model: {dbname: {(day, company_id, document_type, phase): [count, duration, duration_max, queries]}}
+_lock = threading.Lock()
+_buffers = {}
+_buffer_started_at = {}
+
+
+def record_phase(dbname, company_id, document_type, phase, duration, queries=0, count=1, duration_max=None):
+    """Add the duration (seconds) and SQL queries of a phase run for `count` documents.
+
+    `duration_max` is the duration of the slowest of those documents, when it was measured. The duration of a
+    batch is not the one of any of its documents, so batches only add to the totals.
+    """
+    key = (time.strftime('%Y-%m-%d', time.gmtime()), company_id, document_type or 'none', phase)
+    with _lock:
+        buffer = _buffers.setdefault(dbname, {})
+        sample = buffer.get(key)
+        if sample is None:
+            buffer[key] = [count, duration, duration_max, queries]
+            _buffer_started_at.setdefault(dbname, time.monotonic())
+        else:
+            sample[0] += count
+            sample[1] += duration
+            if duration_max is not None:
+                sample[2] = duration_max if sample[2] is None else max(sample[2], duration_max)
+            sample[3] += queries
+
+
+def is_buffer_due(dbname, max_age, max_keys):
+    with _lock:
+        started_at = _buffer_started_at.get(dbname)
+        if started_at is None:
+            return False
+        return time.monotonic() - started_at >= max_age or len(_buffers.get(dbname, ())) >= max_keys
+
+
+def pop_buffer(dbname):
+    with _lock:
+        _buffer_started_at.pop(dbname, None)
+        return _buffers.pop(dbname, {})
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import base64
+import hashlib
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+from odoo.tools.lru import LRU
+
+# Rendered images by (data hash, format), shared by all the worker threads of the process
+_qr_cache = LRU(256)
+
+QR_MIMETYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+def qr_data_hash(data):
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def render_qr(data, fmt='png'):
+    """QR code of the data as PNG or SVG bytes, cached by the hash of the data"""
+    if not data:
+        return False
+    if fmt not in QR_MIMETYPES:
+        raise ValueError("Unsupported QR format: %s" % fmt)
+
+    key = (qr_data_hash(data), fmt)
+    image = _qr_cache.get(key)
+    if image is not None:
+        return image
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=2,
+        border=2,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    temp = BytesIO()
+    if fmt == 'svg':
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(temp)
+    else:
+        qr.make_image().save(temp, format="PNG")
+    image = temp.getvalue()
+
+    _qr_cache[key] = image
+    return image
+
+
+def render_qr_data_uri(data, fmt='svg'):
+    image = render_qr(data, fmt)
+    if not image:
+        return False
+    return 'data:%s;base64,%s' % (QR_MIMETYPES[fmt], base64.b64encode(image).decode())
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+"""Replay or synthesize supplier documents against the in_invoice webhook and report the throughput.
+
+Standalone load test, it is not imported by the module:
+
+    python webhook_replay.py --url https://odoo.example.com/l10n_co_edi_jorels/webhook/in_invoice/1 \
+        --token WEBHOOK_SECRET --count 5000 --batch 100 --concurrency 8
+
+With --file, the documents are read from a JSON array (or one JSON document per line) instead of generated.
+"""
+
+import argparse
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def synthetic_documents(count, seed):
+    for i in range(count):
+        key = "%s-%s" % (seed, i)
+        yield {
+            'idempotency_key': key,
+            'uuid': uuid.uuid5(uuid.NAMESPACE_OID, key).hex * 2,
+            'number': "SETP%s" % (990000000 + i),
+            'issue_date': time.strftime('%Y-%m-%d'),
+            'currency': 'COP',
+            'total': 119000.0,
+            'supplier': {
+                'identification_number': str(900000000 + i % 50),
+                'name': "Supplier %s" % (i % 50),
+            },
+            'lines': [{'description': "Item %s" % i, 'quantity': 1, 'price_unit': 100000.0}],
+        }
+
+
+def file_documents(path):
+    with open(path, encoding='utf-8') as f:
+        content = f.read().strip()
+    if content.startswith('['):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def chunks(documents, size):
+    chunk = []
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', required=True, help="Webhook url, including the company id")
+    parser.add_argument('--token', required=True, help="Company webhook secret")
+    parser.add_argument('--count', type=int, default=1000, help="Synthetic documents to send")
+    parser.add_argument('--batch', type=int, default=50, help="Documents per request")
+    parser.add_argument('--concurrency', type=int, default=4, help="Parallel requests")
+    parser.add_argument('--seed', default=uuid.uuid4().hex[:8],
+                        help="Idempotency key prefix, reuse it to replay the same documents")
+    parser.add_argument('--file', help="JSON file with the documents to replay")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    documents = file_documents(args.file) if args.file else synthetic_documents(args.count, args.seed)
+    session = requests.Session()
+    session.headers.update({'Authorization': 'Bearer %s' % args.token, 'Content-Type': 'application/json'})
+
+    def send(chunk):
+        start = time.monotonic()
+        response = session.post(args.url, data=json.dumps(chunk), timeout=args.timeout)
+        elapsed = time.monotonic() - start
+        result = response.json() if response.headers.get('Content-Type', '').startswith('application/json') else {}
+        return response.status_code, len(chunk), elapsed, result
+
+    totals = {'accepted': 0, 'duplicates': 0, 'invalid': 0}
+    latencies = []
+    sent = errors = 0
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for status, size, elapsed, result in executor.map(send, chunks(documents, args.batch)):
+            sent += size
+            latencies.append(elapsed)
+            if status != 202:
+                errors += 1
+                continue
+            for key in totals:
+                totals[key] += result.get(key, 0)
+    wall = time.monotonic() - start
+
+    latencies.sort()
+    print("Documents sent: %s in %s requests (%s failed)" % (sent, len(latencies), errors))
+    print("Accepted: %(accepted)s, duplicates: %(duplicates)s, invalid: %(invalid)s" % totals)
+    print("Wall time: %.2fs, throughput: %.1f documents/s" % (wall, sent / wall if wall else 0.0))
+    if latencies:
+        print("Request latency: p50 %.3fs, p95 %.3fs, max %.3fs" % (
+            latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            latencies[-1]))
+
+
+if __name__ == '__main__':
+    main()
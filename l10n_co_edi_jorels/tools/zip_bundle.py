@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels.
+#
+# l10n_co_edi_jorels is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+import zipfile
+from io import BytesIO
+
+# Fixed timestamp, so the same files always give the same archive
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def build_zip(files):
+    """Zip archive of the given (name, content) files, built in memory"""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zip_archive:
+        for name, content in files:
+            zip_archive.writestr(zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME), content,
+                                 compress_type=zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
@@ -21,3 +21,4 @@
 #
 
 from . import models
+from .hooks import post_init_hook
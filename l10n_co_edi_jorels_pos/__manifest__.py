@@ -27,7 +27,7 @@
     'author': 'Jorels SAS',
     'license': 'LGPL-3',
     'category': 'Point of Sale',
-    'version': '16.0.22.07.23.02.58',
+    'version': '16.0.26.10.18.00.00',
     'website': 'https://www.jorels.com',
     'images': ['static/images/main_screenshot.png'],
     'support': 'info@jorels.com',
@@ -48,6 +48,7 @@
             'l10n_co_edi_jorels_pos/static/lib/js/qrcode/qrcode.js',
         ],
     },
+    'post_init_hook': 'post_init_hook',
     'installable': True,
     'auto_install': True,
 }
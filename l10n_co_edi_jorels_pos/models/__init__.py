@@ -20,6 +20,7 @@
 # email: info@jorels.com
 #
 
+from . import account_journal
 from . import pos_config
 from . import pos_order
 from . import pos_session
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels_pos.
+#
+# l10n_co_edi_jorels_pos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels_pos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels_pos.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+from odoo import api, fields, models
+
+
+class AccountJournal(models.Model):
+    _inherit = 'account.journal'
+
+    pos_config_ids = fields.One2many('pos.config', 'invoice_journal_id', string='Points of sale')
+    is_pos_journal = fields.Boolean(compute='_compute_is_pos_journal', store=True)
+
+    @api.depends('pos_config_ids', 'pos_config_ids.active')
+    def _compute_is_pos_journal(self):
+        for rec in self:
+            rec.is_pos_journal = bool(rec.pos_config_ids)
+
+    @api.model
+    def _recompute_is_pos_journal(self):
+        """The column already exists with False when the field becomes computed here, so Odoo doesn't compute it"""
+        journals = self.with_context(active_test=False).search([])
+        self.env.add_to_compute(self._fields['is_pos_journal'], journals)
+        journals.flush_model(['is_pos_journal'])
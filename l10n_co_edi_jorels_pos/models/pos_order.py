@@ -43,6 +43,7 @@ class PosOrder(models.Model):
             "number": self.account_move.name,
             "ei_uuid": self.account_move.ei_uuid,
             "ei_qr_data": self.account_move.ei_qr_data,
+            "ei_qr_image": self.account_move.ei_qr_data and self.account_move.get_ei_qr_image_src() or False,
             "ei_is_valid": self.account_move.ei_is_valid,
             "resolution_resolution": self.account_move.resolution_id.resolution_resolution,
             "resolution_resolution_date": self.account_move.resolution_id.resolution_resolution_date,
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2022)
+#
+# This file is part of l10n_co_edi_jorels_pos.
+#
+# l10n_co_edi_jorels_pos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# l10n_co_edi_jorels_pos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with l10n_co_edi_jorels_pos.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+from ..hooks import post_init_hook
+
+
+@tagged('post_install', '-at_install')
+class TestPosJournal(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestPosJournal, cls).setUpClass()
+        cls.journal = cls.env['account.journal'].create({
+            'name': 'POS invoices',
+            'code': 'TPOS',
+            'type': 'sale',
+            'company_id': cls.env.company.id,
+        })
+
+    def test_install_on_journal_used_by_pos(self):
+        pos_config = self.env['pos.config'].create({
+            'name': 'Test shop',
+            'invoice_journal_id': self.journal.id,
+        })
+        self.assertTrue(self.journal.is_pos_journal)
+
+        # As the column is found when the module is installed over an existing point of sale
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE account_journal SET is_pos_journal = FALSE WHERE id = %s", (self.journal.id,))
+        self.env.invalidate_all()
+        self.assertFalse(self.journal.is_pos_journal)
+
+        post_init_hook(self.env.cr, self.env.registry)
+        self.env.invalidate_all()
+        self.assertTrue(self.journal.is_pos_journal)
+
+        pos_config.active = False
+        self.assertFalse(self.journal.is_pos_journal)
+
+    def test_journal_without_pos(self):
+        post_init_hook(self.env.cr, self.env.registry)
+        self.env.invalidate_all()
+        self.assertFalse(self.journal.is_pos_journal)
@@ -36,6 +36,7 @@
     ],
     'data': [
         'data/hr_payroll_sequence.xml',
+        'data/ir_cron_data.xml',
         'views/hr_contract_views.xml',
         'views/hr_salary_rule_views.xml',
         'views/hr_payslip_views.xml',
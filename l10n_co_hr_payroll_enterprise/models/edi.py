@@ -26,10 +26,11 @@ import json
 import logging
 from copy import deepcopy
 
-import requests
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
 
+from odoo.addons.l10n_co_edi_jorels.tools.http_client import http_client
+
 _logger = logging.getLogger(__name__)
 
 
@@ -349,10 +350,10 @@ class Edi(models.Model):
                 _logger.debug("DIAN Validation Request: %s", json.dumps(requests_data, indent=2, sort_keys=False))
                 # raise Warning(json.dumps(requests_data, indent=2, sort_keys=False))
 
-                response = requests.post(api_url,
-                                         json.dumps(requests_data),
-                                         headers=header,
-                                         params=params).json()
+                response = http_client.post(api_url,
+                                            json.dumps(requests_data),
+                                            headers=header,
+                                            params=params).json()
                 _logger.debug('API Response: %s', response)
 
                 if 'detail' in response:
@@ -392,6 +393,38 @@ class Edi(models.Model):
                 else:
                     rec.message_post(body=_("DIAN Electronic payroll: Failed to process the request: %s") % e)
 
+    def init(self):
+        super(Edi, self).init()
+        self.env['l10n_co_edi_jorels.status_sweep']._create_pending_index(self, 'edi_is_valid', 'edi_zip_key',
+                                                                          'edi_uuid')
+
+    @api.model
+    def _get_dian_status_fields(self):
+        return 'edi_is_valid', 'edi_zip_key', 'edi_uuid'
+
+    @api.model
+    def _get_dian_status_pending_domain(self):
+        return [('state', '=', 'done'), ('company_id.edi_payroll_enable', '=', True)]
+
+    def _prepare_dian_status_request(self):
+        self.ensure_one()
+        if not self.company_id.api_key:
+            return False
+        is_not_test = self.edi_is_not_test or self.company_id.edi_payroll_is_not_test
+        return self.env['l10n_co_edi_jorels.status_sweep']._prepare_status_request(
+            self.company_id.api_key, 1 if is_not_test else 2, self.edi_zip_key, self.edi_uuid)
+
+    def _apply_dian_status_response(self, response):
+        self.ensure_one()
+        # The stored payload is kept, the status consultation doesn't rebuild it
+        self.write_response(response, self.edi_payload)
+
+    @api.model
+    def _cron_reconcile_dian_status(self):
+        sweep_env = self.env['l10n_co_edi_jorels.status_sweep']
+        sweep_env._run('hr.payslip')
+        sweep_env._run('hr.payslip.edi')
+
     def _status_zip(self, payload):
         for rec in self:
             try:
@@ -426,10 +459,11 @@ class Edi(models.Model):
 
                     _logger.debug('API URL: %s', api_url)
 
-                    response = requests.post(api_url,
-                                             json.dumps(requests_data),
-                                             headers=header,
-                                             params=params).json()
+                    response = http_client.post(api_url,
+                                                json.dumps(requests_data),
+                                                headers=header,
+                                                params=params,
+                                                idempotent=True).json()
                     _logger.debug('API Response: %s', response)
 
                     if 'detail' in response:
@@ -496,10 +530,11 @@ class Edi(models.Model):
 
                     _logger.debug('API URL: %s', api_url)
 
-                    response = requests.post(api_url,
-                                             json.dumps(requests_data),
-                                             headers=header,
-                                             params=params).json()
+                    response = http_client.post(api_url,
+                                                json.dumps(requests_data),
+                                                headers=header,
+                                                params=params,
+                                                idempotent=True).json()
                     _logger.debug('API Response: %s', response)
 
                     if 'detail' in response:
@@ -781,13 +816,9 @@ class Edi(models.Model):
                         "time_code": "l10n_co_edi_jorels.type_times",
                         "incapacity_code": "l10n_co_edi_jorels.type_incapacities",
                     }
-                    try:
-                        if field_name in model_names:
-                            value = self.env[model_names[field_name]].search([('id', '=', value)])[0].name
-                        elif key in model_names:
-                            value = self.env[model_names[key]].search([('id', '=', value)])[0].name
-                    except IndexError as e:
-                        pass
+                    model_name = model_names.get(field_name) or model_names.get(key)
+                    if model_name:
+                        value = self.env[model_name]._get_name_by_id(value) or value
                 output_temp += "<tr><td class='o_td_label' style='width: 50%;'><label class='o_form_label'><strong>" + \
                                self.get_json2html_field_name(field_name, key) + \
                                "</strong></label></td>" \
@@ -1371,6 +1371,11 @@ class HrPayslip(models.Model):
 
         return res
 
+    @api.model
+    def _get_dian_status_pending_domain(self):
+        return super(HrPayslip, self)._get_dian_status_pending_domain() + [
+            ('company_id.edi_payroll_consolidated_enable', '=', False)]
+
     def status_zip(self):
         for rec in self:
             if not rec.company_id.edi_payroll_enable or rec.company_id.edi_payroll_consolidated_enable:
@@ -307,6 +307,11 @@ class HrPayslipEdi(models.Model):
 
         return True
 
+    @api.model
+    def _get_dian_status_pending_domain(self):
+        return super(HrPayslipEdi, self)._get_dian_status_pending_domain() + [
+            ('company_id.edi_payroll_consolidated_enable', '=', True)]
+
     def status_zip(self):
         for rec in self:
             if not rec.company_id.edi_payroll_enable or not rec.company_id.edi_payroll_consolidated_enable:
@@ -33,6 +33,8 @@
     'support': 'info@jorels.com',
     'depends': ['base'],
     'data': [
+        'security/ir.model.access.csv',
+        'views/csv_file_views.xml',
     ],
     'installable': True,
 }
@@ -21,3 +21,4 @@
 #
 
 from . import res_company
+from . import csv_file
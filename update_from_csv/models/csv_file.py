@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Jorels S.A.S. - Copyright (2019-2021)
+#
+# This file is part of update_from_csv.
+#
+# update_from_csv is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# update_from_csv is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with update_from_csv.  If not, see <https://www.gnu.org/licenses/>.
+#
+# email: info@jorels.com
+#
+
+from odoo import api, fields, models, _
+
+from psycopg2 import sql
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class CsvFile(models.Model):
+    _name = 'update_from_csv.csv_file'
+    _description = 'Loaded csv file'
+    _order = 'name'
+
+    name = fields.Char(string='Csv data', required=True, readonly=True, index=True,
+                       help="Argument of init_csv_data: module name followed by the model name")
+    table_name = fields.Char(string='Table', readonly=True)
+    checksum = fields.Char(string='Checksum', readonly=True, help="SHA-256 of the csv file last loaded")
+    row_count = fields.Integer(string='Records', readonly=True)
+    date_loaded = fields.Datetime(string='Loaded on', readonly=True)
+    duration = fields.Float(string='Duration (s)', digits=(16, 3), readonly=True)
+    inserted_count = fields.Integer(string='Inserted', readonly=True, help="Records inserted by the last sync")
+    updated_count = fields.Integer(string='Updated', readonly=True, help="Records changed by the last sync")
+    removed_count = fields.Integer(string='Removed', readonly=True,
+                                   help="Records archived or deleted by the last sync")
+    loaded_ids = fields.Text(string='Loaded ids', readonly=True,
+                             help="Ids of the last load, the only records a sync may archive or delete")
+
+    _sql_constraints = [
+        ('name_uniq', 'unique (name)', "The csv data must be unique."),
+    ]
+
+    def _is_unchanged(self, checksum):
+        """The same file was already loaded and the table still has at least the records loaded"""
+        if not self or self.checksum != checksum:
+            return False
+        self._cr.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(self.table_name)))
+        return self._cr.fetchone()[0] >= self.row_count
+
+    def _get_loaded_ids(self):
+        return [int(record_id) for record_id in (self.loaded_ids or '').split(',') if record_id]
+
+    @api.model
+    def _register_load(self, name, table_name, checksum, row_count, duration, diff=None, loaded_ids=None):
+        diff = diff or {}
+        vals = {
+            'table_name': table_name,
+            'checksum': checksum,
+            'row_count': row_count,
+            'date_loaded': fields.Datetime.now(),
+            'duration': duration,
+            'inserted_count': diff.get('inserted', 0),
+            'updated_count': diff.get('updated', 0),
+            'removed_count': diff.get('removed', 0),
+            'loaded_ids': ','.join(str(record_id) for record_id in sorted(loaded_ids or [])),
+        }
+        csv_file = self.search([('name', '=', name)], limit=1)
+        if csv_file:
+            csv_file.write(vals)
+        else:
+            csv_file = self.create(dict(vals, name=name))
+        return csv_file
+
+    def action_reload(self):
+        company_env = self.env['res.company']
+        for rec in self:
+            company_env.init_csv_data(rec.name, force=True)
+        return True
+
+    def action_sync(self):
+        company_env = self.env['res.company']
+        for rec in self:
+            company_env.init_csv_data(rec.name, force=True, sync=True)
+        return True
@@ -21,69 +21,429 @@
 #
 
 from odoo import api, fields, models, _
+from odoo.exceptions import AccessError
 from odoo.modules import module
+from odoo.tools import config
+from odoo.tools.sql import column_exists, table_exists
 
 import csv
+import gzip
+import hashlib
+import io
+import os
+import time
 from pathlib import Path
 
+from psycopg2 import sql
+
 import logging
 
 _logger = logging.getLogger(__name__)
 
+CSV_TEMP_TABLE = 'update_from_csv_rows'
+# Audit columns filled by the loader, not exported
+CSV_LOG_COLUMNS = ('create_uid', 'create_date', 'write_uid', 'write_date')
+
 
 class ResCompany(models.Model):
     _inherit = 'res.company'
 
-    def init_csv_data(self, model):
+    @api.model
+    def _check_csv_admin(self):
+        if not (self.env.is_superuser() or self.env.user.has_group('base.group_system')):
+            raise AccessError(_("Only administrators can export or synchronize the csv data."))
+
+    @api.model
+    def _get_csv_data_file(self, model):
+        """Resolve 'module_name.model.name' into (module name, model name, csv file path, table name)"""
+        module_name = model.split('.')[0]
+        model = model[len(module_name) + 1:]
+        module_path = module.get_module_path(module_name)
+        if not module_path:
+            raise ValueError("Module not found: %s" % module_name)
+        return module_name, model, Path(module_path) / 'data' / (model + '.csv'), model.replace(".", "_")
+
+    @api.model
+    def _get_csv_checksum(self, file_path):
+        checksum = hashlib.sha256()
+        with open(file_path, mode="rb") as csv_file:
+            for chunk in iter(lambda: csv_file.read(1024 * 1024), b''):
+                checksum.update(chunk)
+        return checksum.hexdigest()
+
+    @api.model
+    def _is_csv_force_reload(self):
+        return bool(self.env.context.get('update_from_csv_force') or int(
+            self.env['ir.config_parameter'].sudo().get_param('update_from_csv.force_reload', 0)))
+
+    @api.model
+    def _read_csv_header(self, file_path):
+        with open(file_path, mode="r", encoding="utf-8-sig") as csv_file:
+            return next(csv.reader(csv_file, delimiter=',', quotechar='"'))
+
+    @api.model
+    def _copy_csv_to_temp(self, file_path, table_name):
+        """Stream the csv file into a temporary table with the column types of the target table.
+
+        The empty values, quoted or not, are loaded as NULL. Returns the csv column names.
+        """
+        field_names = self._read_csv_header(file_path)
+        columns = sql.SQL(', ').join(sql.Identifier(field_name) for field_name in field_names)
+
+        self._cr.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(CSV_TEMP_TABLE)))
+        self._cr.execute(sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+            sql.Identifier(CSV_TEMP_TABLE), columns, sql.Identifier(table_name)))
+        # Line number, so the last row wins when an id is repeated in the file
+        self._cr.execute(sql.SQL("ALTER TABLE {} ADD COLUMN csv_line SERIAL").format(sql.Identifier(CSV_TEMP_TABLE)))
+
+        with open(file_path, mode="r", encoding="utf-8-sig") as csv_file:
+            self._cr.copy_expert(sql.SQL(
+                "COPY {} ({}) FROM STDIN WITH (FORMAT csv, HEADER true, DELIMITER ',', QUOTE '\"', FORCE_NULL ({}))"
+            ).format(sql.Identifier(CSV_TEMP_TABLE), columns, columns), csv_file)
+        return field_names
+
+    @api.model
+    def _upsert_from_temp(self, table_name, field_names):
+        """Insert or update the rows of the temporary table into the target table in one statement"""
+        columns = sql.SQL(', ').join(sql.Identifier(field_name) for field_name in field_names)
+        updates = sql.SQL(', ').join(sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(field_name))
+                                     for field_name in field_names if field_name != 'id')
+        self._cr.execute(sql.SQL("""
+            INSERT INTO {table} ({columns}, create_uid, create_date, write_uid, write_date)
+            SELECT DISTINCT ON (id) {columns}, %(uid)s, NOW(), %(uid)s, NOW()
+            FROM {temp}
+            ORDER BY id, csv_line DESC
+            ON CONFLICT (id) DO UPDATE SET {updates}, write_uid = EXCLUDED.write_uid, write_date = EXCLUDED.write_date
+        """).format(table=sql.Identifier(table_name), columns=columns, temp=sql.Identifier(CSV_TEMP_TABLE),
+                    updates=updates), {'uid': self.env.user.id})
+        return self._cr.rowcount
+
+    @api.model
+    def _get_unsafe_references(self, table_name):
+        """Tables whose foreign keys to this one would cascade, or be set to NULL or default, on delete"""
+        self._cr.execute("""
+            SELECT DISTINCT conrelid::regclass::text FROM pg_constraint
+            WHERE contype = 'f' AND confrelid = %s::regclass AND confdeltype NOT IN ('r', 'a')
+        """, (table_name,))
+        return sorted(row[0] for row in self._cr.fetchall())
+
+    @api.model
+    def _sync_from_temp(self, table_name, field_names, removed=False, previous_ids=None):
+        """Apply only the differences between the temporary table and the target table.
+
+        The rows are compared by id through a hash of the csv columns: new ids are inserted, rows with another hash
+        are updated and the unchanged ones are not touched. Among `previous_ids`, the ids loaded before from the csv,
+        the ones now missing are archived with removed='archive' (tables with an active column) or deleted with
+        removed='delete'. A delete is refused when a foreign key to the table is not RESTRICT, and falls back to
+        archiving when a RESTRICT key blocks it. Returns the diff: inserted, updated, unchanged and removed.
+        """
+        table = sql.Identifier(table_name)
+        temp = sql.Identifier(CSV_TEMP_TABLE)
+        columns = sql.SQL(', ').join(sql.Identifier(field_name) for field_name in field_names)
+        target_columns = sql.SQL(', ').join(sql.SQL("t.{}").format(sql.Identifier(field_name))
+                                            for field_name in field_names)
+        source_columns = sql.SQL(', ').join(sql.SQL("s.{}").format(sql.Identifier(field_name))
+                                            for field_name in field_names)
+        updates = sql.SQL(', ').join(sql.SQL("{0} = s.{0}").format(sql.Identifier(field_name))
+                                     for field_name in field_names if field_name != 'id')
+        params = {'uid': self.env.user.id}
+
+        # The last line wins when an id is repeated in the file
+        self._cr.execute(sql.SQL("DELETE FROM {temp} a USING {temp} b WHERE a.id = b.id AND a.csv_line < b.csv_line")
+                         .format(temp=temp))
+        self._cr.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(temp))
+        total = self._cr.fetchone()[0]
+
+        self._cr.execute(sql.SQL("""
+            INSERT INTO {table} ({columns}, create_uid, create_date, write_uid, write_date)
+            SELECT {source_columns}, %(uid)s, NOW(), %(uid)s, NOW()
+            FROM {temp} s
+            WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE t.id = s.id)
+        """).format(table=table, columns=columns, source_columns=source_columns, temp=temp), params)
+        inserted = self._cr.rowcount
+
+        self._cr.execute(sql.SQL("""
+            UPDATE {table} t SET {updates}, write_uid = %(uid)s, write_date = NOW()
+            FROM {temp} s
+            WHERE t.id = s.id AND md5(ROW({target_columns})::text) != md5(ROW({source_columns})::text)
+        """).format(table=table, updates=updates, temp=temp, target_columns=target_columns,
+                     source_columns=source_columns), params)
+        updated = self._cr.rowcount
+
+        removed_count = 0
+        if removed:
+            # Only the records of a previous load of this csv, never the ones created by the users
+            removable = sql.SQL("t.id = ANY(%(previous_ids)s) AND NOT EXISTS (SELECT 1 FROM {temp} s WHERE s.id = t.id)"
+                                ).format(temp=temp)
+            params['previous_ids'] = list(previous_ids or [])
+            can_archive = column_exists(self._cr, table_name, 'active')
+            archive = sql.SQL("""
+                UPDATE {table} t SET active = FALSE, write_uid = %(uid)s, write_date = NOW()
+                WHERE t.active AND {removable}
+            """).format(table=table, removable=removable)
+            if removed == 'delete':
+                references = self._get_unsafe_references(table_name)
+                if references:
+                    raise ValueError("The removed records of %s can't be deleted, they would cascade or be emptied in "
+                                     "%s" % (table_name, ", ".join(references)))
+                try:
+                    with self._cr.savepoint():
+                        self._cr.execute(sql.SQL("DELETE FROM {table} t WHERE {removable}").format(
+                            table=table, removable=removable), params)
+                        removed_count = self._cr.rowcount
+                except Exception as e:
+                    # Still referenced through a RESTRICT foreign key
+                    if not can_archive:
+                        raise
+                    _logger.warning("init_csv_data: unable to delete the removed records of %s, archiving them: %s",
+                                    table_name, e)
+                    self._cr.execute(archive, params)
+                    removed_count = self._cr.rowcount
+            elif removed == 'archive':
+                if not can_archive:
+                    raise ValueError("%s has no active column, the removed records can't be archived" % table_name)
+                self._cr.execute(archive, params)
+                removed_count = self._cr.rowcount
+            else:
+                raise ValueError("Invalid removed mode: %s" % removed)
+
+        return {
+            'inserted': inserted,
+            'updated': updated,
+            'unchanged': total - inserted - updated,
+            'removed': removed_count,
+            'total': total,
+        }
+
+    @api.model
+    def _reset_id_sequence(self, table_name):
+        self._cr.execute(sql.SQL("SELECT setval(%s, (SELECT COALESCE(MAX(id), 0) + 1 FROM {}), true)").format(
+            sql.Identifier(table_name)), (table_name + '_id_seq',))
+
+    @api.model
+    def _load_csv_data(self, csv_data, force=False, reset_sequence=True, sync=False, removed=False):
+        """Load one csv file and return its report: csv data, table, records, duration, whether it was skipped and,
+        in sync mode, the diff applied (see _sync_from_temp)"""
+        module_name, model, file_path, table_name = self._get_csv_data_file(csv_data)
+        _logger.debug("Import csv file: %s", file_path.name)
+
+        if not table_exists(self._cr, table_name):
+            raise ValueError("Table not found: %s" % table_name)
+
+        if removed:
+            self._check_csv_admin()
+
+        report = {'csv_data': csv_data, 'table': table_name, 'records': 0, 'duration': 0.0, 'skipped': False}
+
+        csv_file_env = self.env['update_from_csv.csv_file'].sudo()
+        csv_file = csv_file_env.search([('name', '=', csv_data)], limit=1)
+        checksum = self._get_csv_checksum(file_path)
+        if not force and not self._is_csv_force_reload():
+            if csv_file._is_unchanged(checksum):
+                _logger.debug("init_csv_data: %s unchanged, skipped", file_path.name)
+                report['skipped'] = True
+                return report
+
+        start = time.perf_counter()
+        with self._cr.savepoint():
+            field_names = self._copy_csv_to_temp(file_path, table_name)
+            _logger.debug(f'Column names are {", ".join(field_names)}')
+            if sync or removed:
+                report['diff'] = self._sync_from_temp(table_name, field_names, removed, csv_file._get_loaded_ids())
+                line_count = report['diff']['total']
+            else:
+                line_count = self._upsert_from_temp(table_name, field_names)
+            self._cr.execute(sql.SQL("SELECT DISTINCT id FROM {} WHERE id IS NOT NULL").format(
+                sql.Identifier(CSV_TEMP_TABLE)))
+            loaded_ids = [row[0] for row in self._cr.fetchall()]
+            if reset_sequence:
+                self._reset_id_sequence(table_name)
+
+        duration = time.perf_counter() - start
+        csv_file_env._register_load(csv_data, table_name, checksum, line_count, duration, report.get('diff'),
+                                    loaded_ids)
+        _logger.info("init_csv_data: %s records loaded on table %s in %.2f s (%.0f records/s)",
+                     line_count, table_name, duration, line_count / duration if duration else 0.0)
+        if report.get('diff'):
+            _logger.info("init_csv_data: %s: %s inserted, %s updated, %s unchanged, %s removed", table_name,
+                         report['diff']['inserted'], report['diff']['updated'], report['diff']['unchanged'],
+                         report['diff']['removed'])
+
+        # Lookups cached with ormcache (e.g. code -> id) must see the reloaded rows
+        if model in self.env:
+            self.env[model].clear_caches()
+
+        report.update(records=line_count, duration=duration)
+        return report
+
+    def init_csv_data(self, model, force=False, sync=False, removed=False):
+        """Load data/<model>.csv of the module into its table.
+
+        The file is skipped when it was already loaded with the same content, unless `force` is set, the
+        'update_from_csv_force' context key is given or the 'update_from_csv.force_reload' parameter is 1.
+        With `sync`, only the new and changed rows are written, and `removed` ('archive' or 'delete', only for
+        administrators) handles the records of previous loads no longer in the file.
+        """
         try:
-            module_name = model.split('.')[0]
-            model = model[len(module_name) + 1:]
-            file_name = model + '.csv'
-            _logger.debug("Import csv file: %s", file_name)
-
-            module_path = module.get_module_path(module_name)
-            file_path = Path(module_path) / 'data' / file_name
-            table_name = model.replace(".", "_")
-
-            with open(file_path, mode="r", encoding="utf-8-sig") as csv_file:
-                csv_reader = csv.DictReader(csv_file, delimiter=',', quotechar='"')
-                line_count = 0
-                for row in csv_reader:
-                    if line_count == 0:
-                        _logger.debug(f'Column names are {", ".join(row)}')
-                        field_names = row
-
-                    # Insert
-                    query = "insert into " + table_name + "("
-                    for field_name in field_names:
-                        query = query + field_name + ","
-                    query = query + "create_uid,create_date,write_uid,write_date) values("
-                    for field_name in field_names:
-                        val = "$$" + row[field_name] + "$$"
-                        if val == "$$$$":
-                            val = 'NULL'
-                        query = query + val + ','
-                    query = query + str(self.env.user.id) + ',NOW(),' + str(
-                        self.env.user.id) + ',NOW()) ON CONFLICT(id) DO UPDATE SET '
-
-                    # Update
-                    for field_name in field_names:
-                        val = "$$" + row[field_name] + "$$"
-                        if val == "$$$$":
-                            val = 'NULL'
-                        query = query + field_name + "=" + val + ","
-                    query = query + "write_uid=" + str(self.env.user.id) + ",write_date=NOW()"
-
-                    # Execute query
-                    # _logger.debug(query)
-                    self._cr.execute(query)
-
-                    # Count
-                    line_count += 1
-
-                self._cr.execute("select max(id) from " + table_name)
-                max_id = self._cr.dictfetchall()[0]['max']
-                self._cr.execute(f"SELECT setval('{table_name}_id_seq',{str(max_id + 1)}, true)")
-                _logger.debug(f'Processed {line_count} records on table {table_name}')
+            return self._load_csv_data(model, force, sync=sync, removed=removed)['records']
         except Exception as e:
-            _logger.debug("init_csv_data %s", e)
+            _logger.warning("init_csv_data: unable to load %s: %s", model, e)
+
+    @api.model
+    def _sort_csv_models(self, model_names):
+        """Order the models so the targets of their Many2one fields are loaded first"""
+        remaining = set(model_names)
+        dependencies = {}
+        for model_name in model_names:
+            dependencies[model_name] = {
+                field.comodel_name for field in self.env[model_name]._fields.values()
+                if field.type == 'many2one' and field.store and field.comodel_name != model_name
+                and field.comodel_name in remaining
+            }
+
+        ordered = []
+        while remaining:
+            ready = sorted(model_name for model_name in remaining if not dependencies[model_name] & remaining)
+            if not ready:
+                _logger.warning("init_module_csv_data: circular Many2one dependencies between %s",
+                                ", ".join(sorted(remaining)))
+                ready = sorted(remaining)
+            ordered.extend(ready)
+            remaining.difference_update(ready)
+        return ordered
+
+    @api.model
+    def _get_module_csv_models(self, module_name):
+        """Models of the data/<model>.csv files of a module, the files without a model in the registry are ignored"""
+        module_path = module.get_module_path(module_name)
+        if not module_path:
+            _logger.warning("update_from_csv: module not found: %s", module_name)
+            return []
+
+        model_names = []
+        for file_path in sorted((Path(module_path) / 'data').glob('*.csv')):
+            model_name = file_path.stem
+            if model_name in self.env and not self.env[model_name]._abstract:
+                model_names.append(model_name)
+            else:
+                _logger.debug("update_from_csv: %s has no model, ignored", file_path.name)
+        return model_names
+
+    def init_module_csv_data(self, module_name, force=False, sync=False, removed=False):
+        """Load all the data/<model>.csv files of a module in one pass and return the report by table.
+
+        The files are discovered in the data directory, the ones without a model in the registry are ignored, and
+        they are loaded in Many2one dependency order. The id sequences are reset once, at the end. `sync` and
+        `removed` work as in init_csv_data.
+        """
+        if removed:
+            self._check_csv_admin()
+        model_names = self._get_module_csv_models(module_name)
+
+        start = time.perf_counter()
+        report = []
+        for model_name in self._sort_csv_models(model_names):
+            try:
+                report.append(self._load_csv_data(module_name + '.' + model_name, force, reset_sequence=False,
+                                                  sync=sync, removed=removed))
+            except Exception as e:
+                _logger.warning("init_module_csv_data: unable to load %s: %s", model_name, e)
+                report.append({'csv_data': module_name + '.' + model_name, 'table': model_name.replace(".", "_"),
+                               'records': 0, 'duration': 0.0, 'skipped': False, 'error': str(e)})
+
+        for table_report in report:
+            if table_report['records']:
+                self._reset_id_sequence(table_report['table'])
+
+        lines = ["%-60s %9s %9s %s" % ('Table', 'Records', 'Time (s)', 'Status')]
+        for table_report in report:
+            status = table_report.get('error') or ('skipped' if table_report['skipped'] else 'loaded')
+            lines.append("%-60s %9d %9.2f %s" % (table_report['table'], table_report['records'],
+                                                 table_report['duration'], status))
+        _logger.info("init_module_csv_data: %s: %s tables in %.2f s\n%s", module_name, len(report),
+                     time.perf_counter() - start, "\n".join(lines))
+        return report
+
+    @api.model
+    def _get_export_columns(self, file_path, table_name):
+        """Columns of the module csv file when it exists, so the export can replace it, else all the table columns"""
+        if file_path.exists():
+            return self._read_csv_header(file_path)
+        self._cr.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s
+            ORDER BY ordinal_position
+        """, (table_name,))
+        return [row[0] for row in self._cr.fetchall() if row[0] not in CSV_LOG_COLUMNS]
+
+    @api.model
+    def _get_export_path(self, destination, *default):
+        """Export path, always inside <data_dir>/update_from_csv/<database>/"""
+        root = os.path.realpath(os.path.join(config['data_dir'], 'update_from_csv', self._cr.dbname))
+        path = os.path.realpath(os.path.join(root, *(default if destination is None else (destination,))))
+        if os.path.commonpath([root, path]) != root:
+            raise AccessError(_("The csv data can only be exported inside %s") % root)
+        return Path(path)
+
+    def _export_csv_data(self, model, destination=None, compress=False):
+        """Write the table of 'module_name.model.name' to a csv file in the format read by init_csv_data.
+
+        The rows are streamed by PostgreSQL with COPY ... TO STDOUT straight into the file (gzip compressed with
+        `compress`), ordered by id. The file goes to <data_dir>/update_from_csv/<database>/, `destination` is a
+        file or directory relative to it. Only for administrators. Returns the report: csv data, table, file,
+        records, bytes and duration.
+        """
+        self._check_csv_admin()
+        module_name, model_name, file_path, table_name = self._get_csv_data_file(model)
+        if not table_exists(self._cr, table_name):
+            raise ValueError("Table not found: %s" % table_name)
+
+        field_names = self._get_export_columns(file_path, table_name)
+        destination = self._get_export_path(destination, '.')
+        if destination.suffix not in ('.csv', '.gz'):
+            destination = destination / (model_name + ('.csv.gz' if compress else '.csv'))
+        destination.parent.mkdir(parents=True, exist_ok=True)
+
+        # Same layout as the module files: quoted header and values, bare ids, NULL as empty
+        header = io.StringIO()
+        csv.writer(header, delimiter=',', quotechar='"', quoting=csv.QUOTE_ALL, lineterminator='\n').writerow(
+            field_names)
+        quoted = [field_name for field_name in field_names if field_name != 'id']
+        query = sql.SQL("COPY (SELECT {columns} FROM {table} ORDER BY id) TO STDOUT WITH (FORMAT csv{force_quote})"
+                        ).format(columns=sql.SQL(', ').join(sql.Identifier(field_name) for field_name in field_names),
+                                 table=sql.Identifier(table_name),
+                                 force_quote=sql.SQL(", FORCE_QUOTE ({})").format(
+                                     sql.SQL(', ').join(sql.Identifier(field_name) for field_name in quoted))
+                                 if quoted else sql.SQL(''))
+
+        start = time.perf_counter()
+        opener = gzip.open if compress or destination.suffix == '.gz' else open
+        with opener(destination, 'wb') as csv_file:
+            csv_file.write(header.getvalue().encode('utf-8'))
+            self._cr.copy_expert(query, csv_file)
+            records = self._cr.rowcount
+
+        duration = time.perf_counter() - start
+        size = destination.stat().st_size
+        _logger.info("export_csv_data: %s records of table %s written to %s (%s bytes) in %.2f s", records,
+                     table_name, destination, size, duration)
+        return {
+            'csv_data': model,
+            'table': table_name,
+            'file': str(destination),
+            'records': records,
+            'bytes': size,
+            'duration': duration,
+        }
+
+    def _export_module_csv_data(self, module_name, destination=None, compress=False):
+        """Export the tables of all the csv files of a module into a directory, see _export_csv_data"""
+        self._check_csv_admin()
+        destination = str(self._get_export_path(destination, module_name))
+        report = []
+        for model_name in self._get_module_csv_models(module_name):
+            try:
+                report.append(self._export_csv_data(module_name + '.' + model_name, destination, compress))
+            except Exception as e:
+                _logger.warning("export_module_csv_data: unable to export %s: %s", model_name, e)
+        return report